@@ -0,0 +1,212 @@
+"""
+Timing traces for the documentation pipeline.
+
+Every step of a deployment (Sphinx builds, svg2pdf, cleanup_old_prs.py,
+generate_index.py, publish.py, latexmk, ...) records spans of wall time. If the
+BUILD_TRACE_DIR environment variable is set, each process writes its spans
+to its own file in that directory, in Chrome trace format (the JSON read by
+chrome://tracing and https://ui.perfetto.dev).
+
+Usage:
+    # Time any command (e.g. latexmk) as one span
+    python build_trace.py run --name latexmk -- latexmk -pdf doc.tex
+
+    # Merge the traces of a deployment and print the slowest spans
+    python build_trace.py report --top 15 --output trace.json
+"""
+import os
+import sys
+import json
+import time
+import atexit
+import logging
+import argparse
+import subprocess
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Iterator
+
+logger = logging.getLogger(__name__)
+
+# Directory receiving one trace file per process (tracing is off when unset)
+TRACE_DIR_ENV = "BUILD_TRACE_DIR"
+
+# Number of spans listed in the summaries
+DEFAULT_TOP = 10
+
+
+class Tracer:
+    """Spans of wall time recorded by one process."""
+
+    # Tracers of the same process get their own lane in the trace viewers
+    _count = 0
+
+    def __init__(self, name: str):
+        Tracer._count += 1
+        self.name = name
+        self.pid = os.getpid() * 1000 + Tracer._count
+        self.events: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def add(self, name: str, category: str, start: float, duration: float, **args: Any) -> None:
+        """Record a span.
+
+        Args:
+            name: What was timed (a phase, a document, a diagram...)
+            category: Kind of span, e.g. 'phase', 'document', 'diagram'
+            start: Start time, in seconds since the epoch
+            duration: Duration in seconds
+            **args: Details shown with the span
+        """
+        event = {
+            'name': name,
+            'cat': category,
+            'ph': 'X',
+            'ts': round(start * 1e6),
+            'dur': round(duration * 1e6),
+            'pid': self.pid,
+            'tid': threading.get_ident() % 1000000,
+            'args': args,
+        }
+        with self._lock:
+            self.events.append(event)
+
+    @contextmanager
+    def span(self, name: str, category: str = 'phase', **args: Any) -> Iterator[None]:
+        """Time the enclosed block as a span."""
+        start = time.time()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, category, start, time.perf_counter() - started, **args)
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """Events in Chrome trace format, with the process name as metadata."""
+        metadata = {'name': 'process_name', 'ph': 'M', 'pid': self.pid, 'args': {'name': self.name}}
+        return {'traceEvents': [metadata] + self.events, 'displayTimeUnit': 'ms'}
+
+    def save(self, trace_dir: Optional[str] = None) -> Optional[Path]:
+        """Write the trace to <trace_dir>/<name>-<pid>.json.
+
+        Args:
+            trace_dir: Target directory, BUILD_TRACE_DIR by default
+
+        Returns:
+            Path of the trace file, or None if tracing is off
+        """
+        trace_dir = trace_dir or os.environ.get(TRACE_DIR_ENV)
+        if not trace_dir or not self.events:
+            return None
+        path = Path(trace_dir) / f"{self.name}-{self.pid}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_chrome_trace()), encoding='utf-8')
+        return path
+
+
+_tracers: Dict[str, Tracer] = {}
+
+
+def get_tracer(name: str) -> Tracer:
+    """Tracer of this process for a pipeline step, saved when the process exits."""
+    if name not in _tracers:
+        tracer = _tracers[name] = Tracer(name)
+        atexit.register(finish, tracer)
+    return _tracers[name]
+
+
+def finish(tracer: Tracer, top: int = DEFAULT_TOP) -> None:
+    """Save a tracer and log its slowest spans (only when tracing is on)."""
+    if os.environ.get(TRACE_DIR_ENV) and tracer.events:
+        tracer.save()
+        print_summary(tracer.events, top, title=f"Slowest steps of {tracer.name}")
+        tracer.events = []
+
+
+def slowest(events: List[Dict[str, Any]], top: int = DEFAULT_TOP) -> List[Dict[str, Any]]:
+    """The top spans by duration."""
+    spans = [event for event in events if event.get('ph') == 'X']
+    return sorted(spans, key=lambda event: event['dur'], reverse=True)[:top]
+
+
+def print_summary(events: List[Dict[str, Any]], top: int = DEFAULT_TOP, title: str = "Slowest steps") -> None:
+    """Print the top spans by duration, one per line, with the step they belong to."""
+    processes = {event['pid']: event['args']['name'] for event in events
+                 if event.get('ph') == 'M' and event.get('name') == 'process_name'}
+    print(f"===== {title} (top {top}) =====")
+    for event in slowest(events, top):
+        process = f"[{processes[event['pid']]}] " if event['pid'] in processes else ""
+        print(f"  {event['dur'] / 1e6:9.3f}s  {event['cat']:<10} {process}{event['name']}")
+
+
+def load_traces(trace_dir: Path) -> List[Dict[str, Any]]:
+    """All the events of the trace files found in trace_dir."""
+    events = []
+    for path in sorted(trace_dir.glob('*.json')):
+        try:
+            events.extend(json.loads(path.read_text(encoding='utf-8')).get('traceEvents', []))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Skipping unreadable trace {path}: {e}")
+    return events
+
+
+def run_traced(name: str, command: List[str]) -> int:
+    """Run a command and record its wall time as one span.
+
+    Args:
+        name: Name of the span (and of the trace file)
+        command: Command and arguments
+
+    Returns:
+        Exit status of the command
+    """
+    tracer = Tracer(name)
+    with tracer.span(name, 'command', command=' '.join(command)):
+        try:
+            status = subprocess.call(command)
+        except OSError as e:
+            logger.error(f"Cannot run {command[0]}: {e}")
+            status = 127
+    tracer.save()
+    logger.info(f"{name} took {tracer.events[0]['dur'] / 1e6:.3f}s (exit status {status})")
+    return status
+
+
+def main() -> int:
+    """Entry point: run a command traced, or report on the traces of a deployment."""
+    parser = argparse.ArgumentParser(description="Timing traces of the documentation pipeline")
+    subparsers = parser.add_subparsers(dest="action", required=True)
+
+    run_parser = subparsers.add_parser("run", help="run a command and record its wall time")
+    run_parser.add_argument("--name", required=True, help="name of the step")
+    run_parser.add_argument("command", nargs=argparse.REMAINDER, help="command to run, after '--'")
+
+    report_parser = subparsers.add_parser("report", help="merge the traces and print the slowest spans")
+    report_parser.add_argument("--trace-dir", default=os.environ.get(TRACE_DIR_ENV),
+                               help=f"directory of the trace files (default: ${TRACE_DIR_ENV})")
+    report_parser.add_argument("--top", type=int, default=DEFAULT_TOP, help="number of spans listed")
+    report_parser.add_argument("--output", help="write the merged Chrome trace to this file")
+
+    args = parser.parse_args()
+
+    if args.action == "run":
+        command = args.command[1:] if args.command[:1] == ["--"] else args.command
+        if not command:
+            parser.error("missing command")
+        return run_traced(args.name, command)
+
+    if not args.trace_dir:
+        parser.error(f"--trace-dir or ${TRACE_DIR_ENV} is required")
+    events = load_traces(Path(args.trace_dir))
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(json.dumps({'traceEvents': events, 'displayTimeUnit': 'ms'}),
+                                     encoding='utf-8')
+        logger.info(f"Merged trace written to {args.output}")
+    print_summary(events, args.top, title="Slowest steps of the deployment")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,15 +4,40 @@ Script to clean up old PR directories in the gh-pages branch.
 This script:
 1. Gets a list of active (open) PRs using GitHub CLI
 2. Scans the 'prs' directory for PR directories
-3. Removes directories for PRs that are no longer active (closed/merged)
+3. Confirms the state of candidate PRs concurrently, if the list of open PRs
+   may be truncated
+4. Removes directories for PRs that are no longer active (closed/merged)
+
+With --trash, stale directories are renamed into a .trash/ staging area
+(an O(1) rename on the same filesystem) and a background process empties it,
+so the deployment can move on to index generation immediately.
+
+Then the shared asset store (_assets/, see dedupe_assets.py) is trimmed:
+each deployment lists the assets it uses in its .asset-refs.json, and an
+asset is deleted only when no remaining deployment references it.
+
+With --stage, the removed directories and assets are also dropped from the
+git index in a single 'git rm --cached' call, so the deployment never needs
+'git add .'.
 """
 import re
+import sys
+import json
+import uuid
 import shutil
 import logging
+import argparse
 import os
 import subprocess
+import threading
+from collections import Counter
+from concurrent.futures import Executor, ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, List, Set
+from typing import Optional, List, Set, Tuple
+from common_utils import get_pr_info_many
+from dedupe_assets import ASSETS_DIR_NAME, ASSET_REFS_NAME
+from precompress import SIDECAR_SUFFIXES
+from build_trace import get_tracer
 
 # Configure logging
 logging.basicConfig(
@@ -21,6 +46,18 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Number of threads unlinking files (I/O bound, shared by all removals)
+MAX_DELETE_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+# Number of PR directories removed at the same time
+MAX_PARALLEL_DIRECTORIES = 4
+
+# Staging area for directories waiting to be deleted, next to the 'prs' directory
+TRASH_DIR_NAME = ".trash"
+
+# Maximum number of open PRs listed; a list this long may be truncated
+OPEN_PR_LIMIT = 100
+
 def get_active_pr_numbers(repo=None) -> Set[int]:
     """Get the PR numbers of all active (open) PRs.
     
@@ -31,7 +68,7 @@ def get_active_pr_numbers(repo=None) -> Set[int]:
         # Fallback to direct GitHub CLI command if repo object is not available
         # This should work in the GitHub Actions environment with GH_TOKEN
         result = subprocess.run(
-            ["gh", "pr", "list", "--state", "open", "--json", "number"],
+            ["gh", "pr", "list", "--state", "open", "--limit", str(OPEN_PR_LIMIT), "--json", "number"],
             capture_output=True,
             text=True,
             check=True
@@ -74,14 +111,44 @@ def extract_pr_number(pr_dir: str) -> Optional[int]:
     return None
 
 
-def clean_old_pr_directories(prs_dir: str = "prs") -> int:
+def confirm_inactive_prs(pr_numbers: List[int]) -> Set[int]:
+    """Confirm which of the given PRs are really closed or merged.
+    
+    Used when the list of open PRs reached OPEN_PR_LIMIT and may be truncated:
+    every candidate is then checked individually (concurrently) before its
+    directory is removed.
+    
+    Args:
+        pr_numbers: PR numbers that are not in the list of open PRs
+        
+    Returns:
+        The subset of PR numbers whose state is known and not open
+    """
+    inactive = set()
+    for pr_num, pr_info in zip(pr_numbers, get_pr_info_many(pr_numbers, fields="number,state")):
+        if pr_info is None:
+            logger.warning(f"Could not verify the state of PR #{pr_num}, keeping its directory")
+        elif pr_info.get('state') == 'OPEN':
+            logger.warning(f"PR #{pr_num} is still open, keeping its directory")
+        else:
+            inactive.add(pr_num)
+    return inactive
+
+
+def clean_old_pr_directories(prs_dir: str = "prs", use_trash: bool = False, stage: bool = False,
+                             removed_list: Optional[List[Path]] = None) -> int:
     """Clean up old PR directories.
     
     Args:
         prs_dir: Directory containing PR folders
+        use_trash: Move stale directories into the trash instead of deleting
+            them; the caller is responsible for purging it (see start_trash_purge)
+        stage: Also remove the directories from the git index (run from the
+            root of the gh-pages checkout)
+        removed_list: If given, extended with the directories removed
         
     Returns:
-        Number of PR directories removed
+        Number of PR directories removed (or moved to the trash)
     """
     # Check if prs directory exists using Path
     prs_path = Path(prs_dir)
@@ -96,14 +163,11 @@ def clean_old_pr_directories(prs_dir: str = "prs") -> int:
 
     # SAFETY CHECK: If we got a very large set, it means we're in fallback mode
     # and should not remove any directories
-    if len(active_pr_numbers) > 100:  # Arbitrary threshold
+    if len(active_pr_numbers) > OPEN_PR_LIMIT:
         logger.warning("Too many active PRs detected. This is likely a fallback safety measure.")
         logger.info("Skipping cleanup to prevent accidental removal of PR directories.")
         return 0
 
-    # Initialize counter for removed directories
-    removed_count = 0
-
     # Check each PR directory using pathlib
     try:
         # Get all directories in prs_path
@@ -112,6 +176,7 @@ def clean_old_pr_directories(prs_dir: str = "prs") -> int:
         logger.error(f"Error accessing {prs_dir} directory: {e}")
         return 0
 
+    candidates = []
     for pr_dir in pr_dirs:
         pr_dir_name = pr_dir.name
 
@@ -127,39 +192,314 @@ def clean_old_pr_directories(prs_dir: str = "prs") -> int:
 
         # Check if PR is active
         if pr_num not in active_pr_numbers:
+            candidates.append((pr_num, pr_dir))
+
+    if len(active_pr_numbers) < OPEN_PR_LIMIT:
+        # Complete list: every other PR is closed or merged
+        inactive_pr_numbers = {pr_num for pr_num, _ in candidates}
+    else:
+        logger.info(f"{OPEN_PR_LIMIT} open PRs listed, the list may be truncated: "
+                    f"checking the {len(candidates)} candidates one by one")
+        inactive_pr_numbers = confirm_inactive_prs([pr_num for pr_num, _ in candidates])
+
+    stale_dirs = []
+    for pr_num, pr_dir in candidates:
+        if pr_num in inactive_pr_numbers:
             logger.info(f"PR #{pr_num} is not active, removing directory {pr_dir}")
+            stale_dirs.append(pr_dir)
 
-            try:
-                # Remove the directory and its contents
-                if _safe_remove_directory(pr_dir):
-                    removed_count += 1
-            except Exception as e:
-                logger.error(f"Error removing {pr_dir}: {e}")
+    if use_trash:
+        trash_path = get_trash_path(prs_path)
+        removed_dirs = [d for d in stale_dirs if move_to_trash(d, trash_path)]
+        removed_count = len(removed_dirs)
+    else:
+        removed_count = _remove_directories(stale_dirs)
+        removed_dirs = [d for d in stale_dirs if not d.exists()]
+
+    if stage:
+        unstage_paths(removed_dirs)
+    if removed_list is not None:
+        removed_list.extend(removed_dirs)
 
     logger.info(f"Removed {removed_count} PR directories that were no longer active.")
     return removed_count
 
 
-def _safe_remove_directory(directory: Path) -> bool:
+def unstage_paths(paths: List[Path]) -> bool:
+    """Remove files and directories from the git index with a single git call.
+    
+    Args:
+        paths: Paths relative to the root of the checkout
+        
+    Returns:
+        True if git succeeded, False otherwise
+    """
+    if not paths:
+        return True
+    # Paths are passed on stdin (no command line limit) and taken literally
+    env = dict(os.environ, GIT_LITERAL_PATHSPECS="1")
+    result = subprocess.run(
+        ["git", "rm", "-r", "-q", "--cached", "--ignore-unmatch",
+         "--pathspec-from-file=-", "--pathspec-file-nul"],
+        input="\0".join(p.as_posix() for p in paths).encode("utf-8"),
+        env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    if result.returncode != 0:
+        logger.error(f"git rm failed: {result.stderr.decode('utf-8', 'replace').strip()}")
+        return False
+    logger.info(f"Unstaged {len(paths)} paths")
+    return True
+
+def count_asset_references(site_dir: Path) -> Tuple[Counter, int]:
+    """Count the deployments using each asset of the store.
+    
+    Deployments are versione-corrente, prs/prNN and releases/<tag>, so refs
+    files are only looked for one and two levels deep; hidden directories
+    (such as the trash) and the store itself are ignored.
+    
+    Args:
+        site_dir: Root of the gh-pages checkout
+        
+    Returns:
+        Tuple (reference count by asset key, number of deployments found)
+    """
+    refs = Counter()
+    deployments = 0
+    for pattern in (f"*/{ASSET_REFS_NAME}", f"*/*/{ASSET_REFS_NAME}"):
+        for refs_file in site_dir.glob(pattern):
+            if any(part.startswith(('.', '_')) for part in refs_file.relative_to(site_dir).parts[:-1]):
+                continue
+            try:
+                refs.update(set(json.loads(refs_file.read_text(encoding="utf-8"))))
+                deployments += 1
+            except (OSError, ValueError) as e:
+                # Keep everything rather than risk deleting assets still in use
+                logger.error(f"Cannot read {refs_file}: {e}")
+                return Counter(), 0
+    return refs, deployments
+
+def trim_asset_store(site_dir: Path, stage: bool = False) -> int:
+    """Delete the assets of the shared store that no deployment references.
+    
+    Args:
+        site_dir: Root of the gh-pages checkout (relative to the working
+            directory when staging)
+        stage: Also remove the deleted assets from the git index
+        
+    Returns:
+        Number of assets deleted
+    """
+    store_dir = site_dir / ASSETS_DIR_NAME
+    if not store_dir.is_dir():
+        return 0
+
+    refs, deployments = count_asset_references(site_dir)
+    if not deployments:
+        logger.warning("No asset references found, not trimming the asset store.")
+        return 0
+
+    def asset_key(path: Path) -> str:
+        # Precompressed sidecars live and die with their asset
+        key = path.relative_to(store_dir).as_posix()
+        for suffix in SIDECAR_SUFFIXES.values():
+            if key.endswith(suffix) and path.with_suffix('').is_file():
+                return key[:-len(suffix)]
+        return key
+
+    unused = [path for path in store_dir.glob("*/*") if path.is_file() and refs[asset_key(path)] == 0]
+    for path in unused:
+        _unlink(str(path))
+        try:
+            path.parent.rmdir()
+        except OSError:
+            pass  # other names with the same content are still there
+
+    logger.info(f"Asset store: {len(refs)} assets referenced by {deployments} deployments, "
+                f"{len(unused)} unused assets deleted.")
+    if stage:
+        unstage_paths(unused)
+    return len(unused)
+
+def get_trash_path(prs_path: Path) -> Path:
+    """Get the trash directory used for a 'prs' directory.
+    
+    Args:
+        prs_path: Directory containing PR folders
+        
+    Returns:
+        Path of the trash directory (a sibling, so renames stay on one filesystem)
+    """
+    return prs_path.resolve().parent / TRASH_DIR_NAME
+
+
+def move_to_trash(directory: Path, trash_path: Path) -> bool:
+    """Atomically move a directory into the trash.
+    
+    Args:
+        directory: Directory to move
+        trash_path: Trash directory
+        
+    Returns:
+        True if the directory was moved, False otherwise
+    """
+    try:
+        trash_path.mkdir(exist_ok=True)
+        # Keep the staging area out of 'git add .' on the gh-pages checkout
+        gitignore = trash_path / ".gitignore"
+        if not gitignore.exists():
+            gitignore.write_text("*\n", encoding="utf-8")
+
+        os.rename(directory, trash_path / f"{directory.name}-{uuid.uuid4().hex}")
+        logger.info(f"Moved directory {directory} to {trash_path}")
+        return True
+    except OSError as e:
+        logger.error(f"Error moving {directory} to the trash: {e}")
+        return False
+
+
+def purge_trash(trash_path: Path) -> int:
+    """Delete everything in the trash, including leftovers of interrupted runs.
+    
+    Args:
+        trash_path: Trash directory
+        
+    Returns:
+        Number of directories deleted
+    """
+    try:
+        with os.scandir(trash_path) as entries:
+            trashed = [Path(entry.path) for entry in entries if entry.is_dir(follow_symlinks=False)]
+    except FileNotFoundError:
+        return 0
+
+    removed_count = _remove_directories(trashed)
+    logger.info(f"Purged {removed_count} directories from {trash_path}")
+    return removed_count
+
+
+def start_trash_purge(trash_path: Path, detach: bool = False) -> Optional[threading.Thread]:
+    """Empty the trash in the background.
+    
+    Args:
+        trash_path: Trash directory
+        detach: Purge in a separate process that outlives this one instead
+            of in a thread of the current process
+        
+    Returns:
+        The purging thread, or None if a separate process was started
+    """
+    if detach:
+        subprocess.Popen(
+            [sys.executable, str(Path(__file__).resolve()), "--purge-trash", str(trash_path)],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True
+        )
+        logger.info(f"Started background purge of {trash_path}")
+        return None
+
+    thread = threading.Thread(target=purge_trash, args=(trash_path,), name="trash-purge")
+    thread.start()
+    return thread
+
+
+def _remove_directories(directories: List[Path]) -> int:
+    """Remove several directories in parallel.
+    
+    Args:
+        directories: Directories to remove
+        
+    Returns:
+        Number of directories successfully removed
+    """
+    if not directories:
+        return 0
+
+    # Directory workers only walk trees and wait for their files, so the
+    # file pool is separate to avoid a worker waiting on its own pool
+    with ThreadPoolExecutor(max_workers=MAX_DELETE_WORKERS) as file_executor, \
+            ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_DIRECTORIES, len(directories))) as dir_executor:
+        results = dir_executor.map(lambda d: _safe_remove_directory(d, file_executor), directories)
+        return sum(1 for removed in results if removed)
+
+
+def _walk_tree(directory: Path) -> Tuple[List[str], List[str]]:
+    """Walk a directory tree once with os.scandir.
+    
+    Args:
+        directory: Root of the tree
+        
+    Returns:
+        Tuple of (files and symlinks, subdirectories ordered deepest first)
+    """
+    files, dirs = [], []
+    pending = [str(directory)]
+    while pending:
+        current = pending.pop()
+        with os.scandir(current) as entries:
+            for entry in entries:
+                # Symlinks are removed as links, never followed
+                if entry.is_dir(follow_symlinks=False):
+                    dirs.append(entry.path)
+                    pending.append(entry.path)
+                else:
+                    files.append(entry.path)
+    # A directory is always listed after its parent, so reversing the
+    # discovery order empties children before their parents
+    dirs.reverse()
+    return files, dirs
+
+
+def _unlink(path: str) -> bool:
+    """Remove a file, logging (not raising) failures.
+    
+    Args:
+        path: Path of the file to remove
+        
+    Returns:
+        True if the file no longer exists, False otherwise
+    """
+    try:
+        os.unlink(path)
+        return True
+    except FileNotFoundError:
+        return True
+    except Exception as e:
+        logger.warning(f"Could not remove file {path}: {e}")
+        return False
+
+
+def _safe_remove_directory(directory: Path, executor: Optional[Executor] = None) -> bool:
     """Safely remove a directory by first removing its contents.
     
+    The tree is walked once; files are unlinked concurrently on the given
+    executor, then the emptied directories are removed bottom-up.
+    
     Args:
         directory: Path to the directory to remove
+        executor: Executor used to unlink files (a private pool if None)
         
     Returns:
         True if directory was successfully removed, False otherwise
     """
     try:
         # Remove all files
-        for item in directory.rglob("*"):
-            if item.is_file():
-                try:
-                    item.unlink()
-                except Exception as e:
-                    logger.warning(f"Could not remove file {item}: {e}")
+        files, dirs = _walk_tree(directory)
+        if executor is None:
+            with ThreadPoolExecutor(max_workers=MAX_DELETE_WORKERS) as own_executor:
+                list(own_executor.map(_unlink, files))
+        else:
+            list(executor.map(_unlink, files))
 
-        # Then remove directory
-        shutil.rmtree(directory)
+        # Then remove the (now empty) directories
+        for subdir in dirs + [str(directory)]:
+            try:
+                os.rmdir(subdir)
+            except OSError:
+                # Something could not be removed above: let rmtree retry
+                shutil.rmtree(directory, ignore_errors=True)
+                break
 
         # Verify removal
         if not directory.exists():
@@ -173,5 +513,44 @@ def _safe_remove_directory(directory: Path) -> bool:
         return False
 
 
+def main() -> None:
+    """Main function to clean up old PR directories from the gh-pages root."""
+    parser = argparse.ArgumentParser(description="Remove preview directories of closed PRs")
+    parser.add_argument("--prs-dir", default="prs", help="directory containing PR folders")
+    parser.add_argument("--trash", action="store_true",
+                        help="move stale directories to the trash and purge it in the background")
+    parser.add_argument("--purge-trash", metavar="TRASH_DIR",
+                        help="only empty the given trash directory, then exit")
+    parser.add_argument("--stage", action="store_true",
+                        help="also remove the stale directories and assets from the git index")
+    parser.add_argument("--removed-list", metavar="FILE",
+                        help="write the removed deployment paths (e.g. prs/pr17) to FILE, one per line, "
+                             "for generate_index.py --removed")
+    args = parser.parse_args()
+
+    tracer = get_tracer("cleanup_old_prs")
+    if args.purge_trash:
+        with tracer.span("purge trash"):
+            purge_trash(Path(args.purge_trash))
+        return
+
+    removed_dirs = []
+    with tracer.span("clean PR directories", trash=args.trash):
+        clean_old_pr_directories(args.prs_dir, use_trash=args.trash, stage=args.stage, removed_list=removed_dirs)
+    if args.removed_list:
+        prs_path = Path(args.prs_dir)
+        with open(args.removed_list, "w", encoding="utf-8") as f:
+            f.writelines(f"{(Path(prs_path.name) / d.name).as_posix()}\n" for d in removed_dirs)
+
+    with tracer.span("trim asset store"):
+        trim_asset_store(Path(args.prs_dir).parent, stage=args.stage)
+
+    # Also picks up leftovers of previous runs that were interrupted
+    trash_path = get_trash_path(Path(args.prs_dir))
+    if trash_path.is_dir():
+        with tracer.span("start trash purge"):
+            start_trash_purge(trash_path, detach=args.trash)
+
+
 if __name__ == "__main__":
-    clean_old_pr_directories()
+    main()
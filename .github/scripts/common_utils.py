@@ -5,7 +5,8 @@ import os
 import subprocess
 import json
 import logging
-from typing import Dict, List, Optional, Any, Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Any, Sequence, Union
 
 # Configure logging
 logging.basicConfig(
@@ -15,11 +16,20 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def run_command(command: str) -> Optional[str]:
-    """Run a shell command and return the output.
+# Default number of concurrent GitHub CLI calls
+DEFAULT_MAX_WORKERS = 8
+
+# Default timeout (seconds) for a single GitHub CLI call
+DEFAULT_TIMEOUT = 30
+
+
+def run_command(command: Union[str, Sequence[str]], timeout: Optional[float] = None) -> Optional[str]:
+    """Run a command and return the output.
     
     Args:
-        command: Command to execute
+        command: Command to execute; a string is run through the shell, a
+            sequence of arguments is executed directly
+        timeout: Maximum time in seconds to wait for the command
         
     Returns:
         Command output if successful, None otherwise
@@ -27,17 +37,25 @@ def run_command(command: str) -> Optional[str]:
     try:
         result = subprocess.run(
             command, 
-            shell=True, 
+            shell=isinstance(command, str), 
             check=True, 
             stdout=subprocess.PIPE, 
             stderr=subprocess.PIPE,
-            text=True  # More readable than universal_newlines
+            text=True,  # More readable than universal_newlines
+            timeout=timeout
         )
         return result.stdout.strip()
     except subprocess.CalledProcessError as e:
         logger.error(f"Error executing command: {command}")
         logger.error(f"Error message: {e.stderr}")
         return None
+    except subprocess.TimeoutExpired:
+        logger.error(f"Command timed out after {timeout}s: {command}")
+        return None
+    except OSError as e:
+        logger.error(f"Error executing command: {command}")
+        logger.error(f"Error message: {e}")
+        return None
 
 
 def get_github_repo() -> Optional[str]:
@@ -74,6 +92,77 @@ def get_pr_info(pr_num: Union[int, str], fields: str = "number,title", repo: Opt
         return None
 
 
+def get_pr_info_many(pr_nums: Sequence[Union[int, str]], fields: str = "number,title", repo: Optional[str] = None,
+                     max_workers: int = DEFAULT_MAX_WORKERS, timeout: float = DEFAULT_TIMEOUT) -> List[Optional[Dict[str, Any]]]:
+    """Get information about several PRs concurrently.
+    
+    Each lookup runs 'gh pr view' directly (no shell) in a thread pool.
+    
+    Args:
+        pr_nums: PR numbers
+        fields: Comma-separated list of fields to retrieve
+        repo: Repository in format 'owner/repo'
+        max_workers: Maximum number of concurrent lookups
+        timeout: Timeout in seconds for each lookup
+        
+    Returns:
+        PR information in the same order as pr_nums (None for failed lookups)
+    """
+    def lookup(pr_num: Union[int, str]) -> Optional[Dict[str, Any]]:
+        command = ["gh", "pr", "view", str(pr_num), "--json", fields]
+        if repo:
+            command += ["--repo", repo]
+        
+        output = run_command(command, timeout=timeout)
+        if not output:
+            return None
+        
+        try:
+            return json.loads(output)
+        except json.JSONDecodeError:
+            logger.error(f"Failed to parse JSON output: {output}")
+            return None
+    
+    if not pr_nums:
+        return []
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(pr_nums)))) as executor:
+        return list(executor.map(lookup, pr_nums))
+
+
+def get_prs_info(fields: str = "number,title", state: str = "all", repo: Optional[str] = None, limit: int = 1000) -> Dict[int, Dict[str, Any]]:
+    """Get information about many PRs with a single GitHub CLI call.
+    
+    Args:
+        fields: Comma-separated list of fields to retrieve (must include 'number')
+        state: PR state filter ('open', 'closed', 'merged' or 'all')
+        repo: Repository in format 'owner/repo'
+        limit: Maximum number of PRs to fetch (a warning is logged when reached)
+        
+    Returns:
+        Dictionary mapping PR numbers to PR information (empty if retrieval failed)
+    """
+    repo_option = f"--repo {repo}" if repo else ""
+    command = f"gh pr list --state {state} --limit {limit} --json {fields} {repo_option}"
+    
+    output = run_command(command)
+    if not output:
+        logger.warning("Failed to fetch PR information in bulk.")
+        return {}
+    
+    try:
+        prs_data = json.loads(output)
+        prs_info = {pr['number']: pr for pr in prs_data}
+    except (json.JSONDecodeError, KeyError, TypeError):
+        logger.error(f"Failed to parse JSON output: {output}")
+        return {}
+    
+    if len(prs_data) >= limit:
+        logger.warning(f"'gh pr list' returned {len(prs_data)} PRs, the limit: older PRs are missing "
+                       f"and must be looked up one by one")
+    return prs_info
+
+
 def get_active_pr_numbers(repo: Optional[str] = None) -> List[int]:
     """Get list of active (open) PR numbers using GitHub CLI.
     
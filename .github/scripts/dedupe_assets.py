@@ -0,0 +1,243 @@
+"""
+Move the Sphinx static assets of a deployment into a shared, content-addressed store.
+
+Every deployment (versione-corrente, prs/prNN, releases/<tag>) carries a
+copy of the _static directory of each language build: theme CSS/JS, fonts,
+Redoc, search tooling... These files are nearly always byte-identical across
+deployments. This script:
+1. Moves each file of <build>/_static to /_assets/<hash>/<name>, where <hash>
+   is derived from its content (CSS files are hashed after their url(...)
+   references have been rewritten, so a changed font changes the CSS hash too)
+2. Rewrites the references of the HTML pages (and of the CSS files) to point
+   to the store, with relative URLs so the site still works under a prefix
+3. Records the assets used by the deployment in <path>/.asset-refs.json,
+   which cleanup_old_prs.py reads to reference-count the store
+
+Run it on the build output, before publish.py:
+    python dedupe_assets.py --site html prs/pr42
+"""
+import os
+import re
+import sys
+import json
+import shutil
+import hashlib
+import logging
+import argparse
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+from build_trace import get_tracer
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Store of the shared assets, at the root of the site
+ASSETS_DIR_NAME = "_assets"
+
+# Assets used by a deployment, stored in its directory
+ASSET_REFS_NAME = ".asset-refs.json"
+
+# Sphinx static directory of a build
+STATIC_DIR_NAME = "_static"
+
+# Length of the content hash used as store directory
+HASH_LENGTH = 20
+
+# Quoted or url(...) relative URLs that go through a _static directory, with
+# the cache-busting query string Sphinx appends ('?v=...')
+HTML_REF_RE = re.compile(r'''(?P<prefix>["'(])(?P<url>[^"'()\s:?#]*_static/[^"'()\s?#]+)(?P<query>\?[^"'()\s#]*)?''')
+
+# References between static files: url(...), @import "..." and source maps
+CSS_REF_RE = re.compile(
+    r'''(?P<prefix>url\(\s*["']?|@import\s+["']|sourceMappingURL=)(?P<url>[^"'()\s?#]+)(?P<query>[?#][^"'()\s]*)?'''
+)
+
+
+def content_hash(data: bytes) -> str:
+    """Store key of an asset."""
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+
+def find_builds(deploy_dir: Path) -> List[Path]:
+    """Sphinx HTML builds of a deployment (its language directories, or itself)."""
+    candidates = [deploy_dir] + sorted(p for p in deploy_dir.iterdir() if p.is_dir())
+    return [p for p in candidates if (p / STATIC_DIR_NAME).is_dir()]
+
+
+def _relative_url(target: Path, base_dir: Path) -> str:
+    return Path(os.path.relpath(target, base_dir)).as_posix()
+
+
+def _is_within(path: Path, directory: Path) -> bool:
+    # Path.is_relative_to() needs Python 3.9
+    try:
+        path.relative_to(directory)
+        return True
+    except ValueError:
+        return False
+
+
+def _resolve(url: str, base_dir: Path) -> Optional[Path]:
+    """Absolute path a relative URL points to, None for absolute or external URLs."""
+    if not url or url.startswith(('/', 'data:')) or ':' in url:
+        return None
+    return Path(os.path.normpath(base_dir / url))
+
+
+class AssetStore:
+    """Content-addressed store of the static assets shared by all deployments."""
+
+    def __init__(self, store_dir: Path):
+        self.store_dir = store_dir
+        # Source file -> path in the store, for every asset moved by this run
+        self.stored: Dict[Path, Path] = {}
+        self.bytes_moved = 0
+        self.bytes_shared = 0
+
+    def key(self, stored: Path) -> str:
+        """'<hash>/<name>' of a stored asset, as listed in the refs files."""
+        return stored.relative_to(self.store_dir).as_posix()
+
+    def add(self, path: Path, static_dir: Path, pending: Optional[Set[Path]] = None) -> Path:
+        """Move a static file into the store, after its own references.
+
+        Args:
+            path: File inside static_dir
+            static_dir: _static directory of the build
+            pending: Files being stored up the call stack (reference cycles)
+
+        Returns:
+            Path of the asset in the store
+        """
+        if path in self.stored:
+            return self.stored[path]
+        pending = (pending or set()) | {path}
+
+        data = path.read_bytes()
+        if path.suffix == '.css':
+            data = self._rewrite_css(data, path, static_dir, pending)
+
+        digest = content_hash(data)
+        target = self.store_dir / digest / path.name
+        if target.exists():
+            self.bytes_shared += len(data)
+        else:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = target.with_name(target.name + ".tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, target)
+            self.bytes_moved += len(data)
+        path.unlink()
+        self.stored[path] = target
+        return target
+
+    def _rewrite_css(self, data: bytes, path: Path, static_dir: Path, pending: Set[Path]) -> bytes:
+        text = data.decode('utf-8', 'surrogateescape')
+        # The stored CSS lives in a sibling of the directories of the files it
+        # references, whatever its hash: '../<hash>/<name>'
+        target_dir = self.store_dir / "_"
+
+        def replace(match):
+            ref = _resolve(match.group('url'), path.parent)
+            if ref is None or not _is_within(ref, static_dir):
+                return match.group(0)
+            if ref in self.stored:
+                stored = self.stored[ref]
+            elif ref in pending or not ref.is_file():
+                return match.group(0)  # reference cycle or missing file
+            else:
+                stored = self.add(ref, static_dir, pending)
+            return match.group('prefix') + _relative_url(stored, target_dir) + (match.group('query') or '')
+
+        return CSS_REF_RE.sub(replace, text).encode('utf-8', 'surrogateescape')
+
+    def rewrite_html(self, page: Path) -> bool:
+        """Point the _static references of a page to the store.
+
+        Returns:
+            True if the page changed
+        """
+        text = page.read_text(encoding='utf-8', errors='surrogateescape')
+
+        def replace(match):
+            ref = _resolve(match.group('url'), page.parent)
+            if ref is None or ref not in self.stored:
+                return match.group(0)
+            # The content hash replaces the '?v=...' cache buster
+            return match.group('prefix') + _relative_url(self.stored[ref], page.parent)
+
+        new_text = HTML_REF_RE.sub(replace, text)
+        if new_text == text:
+            return False
+        page.write_text(new_text, encoding='utf-8', errors='surrogateescape')
+        return True
+
+
+def dedupe_build(build_dir: Path, store: AssetStore) -> List[str]:
+    """Move the _static directory of one build into the store.
+
+    Args:
+        build_dir: Sphinx HTML output directory (contains _static)
+        store: Asset store
+
+    Returns:
+        Keys of the assets the build uses
+    """
+    static_dir = build_dir / STATIC_DIR_NAME
+    files = sorted(p for p in static_dir.rglob('*') if p.is_file())
+    used = [store.key(store.add(path, static_dir)) for path in files]
+
+    pages = [p for p in build_dir.rglob('*.html') if static_dir not in p.parents]
+    changed = sum(store.rewrite_html(page) for page in pages)
+    shutil.rmtree(static_dir)
+    logger.info(f"{build_dir}: {len(files)} assets moved to the store, {changed}/{len(pages)} pages rewritten")
+    return used
+
+
+def dedupe_deployment(site_dir: Path, rel_path: str) -> List[str]:
+    """Move the static assets of a deployment into the store of the site.
+
+    Args:
+        site_dir: Root of the site (e.g. html/), where the store lives
+        rel_path: Deployment path relative to site_dir (e.g. prs/pr42)
+
+    Returns:
+        Keys of the assets the deployment uses, also written to its refs file
+    """
+    deploy_dir = site_dir / rel_path
+    store = AssetStore(site_dir / ASSETS_DIR_NAME)
+    used = set()
+    for build_dir in find_builds(deploy_dir):
+        used.update(dedupe_build(build_dir, store))
+
+    (deploy_dir / ASSET_REFS_NAME).write_text(json.dumps(sorted(used), indent=0), encoding='utf-8')
+    logger.info(f"{rel_path}: uses {len(used)} shared assets "
+                f"({store.bytes_moved / 1024:.0f} KiB stored, {store.bytes_shared / 1024:.0f} KiB deduplicated)")
+    return sorted(used)
+
+
+def main() -> int:
+    """Deduplicate the static assets of the given deployment paths."""
+    parser = argparse.ArgumentParser(description="Move Sphinx _static files into a shared content-addressed store")
+    parser.add_argument("--site", default="html", help="root of the site, where _assets/ is created (default: html)")
+    parser.add_argument("paths", nargs="+", help="deployment paths relative to the site root, e.g. prs/pr42")
+    args = parser.parse_args()
+
+    tracer = get_tracer("dedupe_assets")
+    site_dir = Path(args.site)
+    for rel_path in args.paths:
+        rel_path = Path(rel_path).as_posix().strip("/")
+        if not (site_dir / rel_path).is_dir():
+            logger.error(f"Deployment directory {site_dir / rel_path} does not exist")
+            return 1
+        with tracer.span(f"dedupe {rel_path}"):
+            dedupe_deployment(site_dir, rel_path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
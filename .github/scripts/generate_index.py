@@ -5,14 +5,31 @@ This script:
 1. Scans the current directory for documentation folders
 2. Builds a structure of available documentation versions
 3. Generates an HTML index with links to all available documentation
+
+The structure is persisted in a state file, so a deployment that only adds or
+removes a few directories can patch it (--added/--removed) instead of
+rescanning the whole tree.
+
+The search indexes of versione-corrente and of the releases are merged into
+search-index.json (see search_index.py), searched from the index page; only
+the builds whose searchindex.js changed are read again.
 """
+import os
+import re
+import json
+import stat
 import shutil
+import argparse
 from datetime import datetime
+from functools import lru_cache
 import logging
 from pathlib import Path
-from typing import Dict, Any
-from jinja2 import Environment, FileSystemLoader
-from common_utils import get_github_repo, get_pr_info
+from typing import Dict, Any, List, Optional, Sequence
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template
+from common_utils import get_github_repo
+from pr_cache import PR_CACHE_FILE, get_cached_pr_titles
+from search_index import SEARCH_INDEX_FILE, load_search_index, save_search_index, update_search_index
+from build_trace import get_tracer
 
 # Configure logging
 logging.basicConfig(
@@ -25,11 +42,130 @@ logger = logging.getLogger(__name__)
 GITHUB_DIR = Path(__file__).resolve().parent.parent
 
 
-def scan_directory(base_path: str = '.') -> Dict[str, Any]:
+# Languages always present in the structure (the template links them explicitly)
+DEFAULT_LANGUAGES = ('it', 'en')
+
+# Template name
+INDEX_TEMPLATE = "index-template.html"
+
+# Persisted structure used by incremental updates, relative to the gh-pages root
+INDEX_STATE_FILE = "index-state.json"
+INDEX_STATE_VERSION = 1
+
+
+def _list_subdirs(path: str) -> List[os.DirEntry]:
+    """List the subdirectories of a path with a single scandir call.
+    
+    Hidden directories (such as the .trash staging area of cleanup_old_prs)
+    are skipped.
+    
+    Args:
+        path: Directory to list
+        
+    Returns:
+        Directory entries of the subdirectories (empty if path is not a directory)
+    """
+    try:
+        with os.scandir(path) as entries:
+            return [entry for entry in entries if entry.is_dir() and not entry.name.startswith('.')]
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+
+
+def _scan_languages(path: str) -> Dict[str, bool]:
+    """Discover the language builds of a deployment directory.
+    
+    Args:
+        path: Deployment directory (e.g. 'prs/pr12')
+        
+    Returns:
+        Dictionary mapping each language to whether its index.html exists
+    """
+    languages = dict.fromkeys(DEFAULT_LANGUAGES, False)
+    # Directory types come from the scandir entries; index.html costs one stat per language
+    for name, lang_path in sorted((entry.name, entry.path) for entry in _list_subdirs(path)):
+        try:
+            if stat.S_ISREG(os.stat(f"{lang_path}{os.sep}index.html").st_mode):
+                languages[name] = True
+        except OSError:
+            pass
+    return languages
+
+
+def _scan_pr(pr_dir: str, pr_titles: Dict[int, str]) -> Optional[Dict[str, Any]]:
+    """Build the structure entry of a PR preview directory.
+    
+    Args:
+        pr_dir: Path of the PR directory (e.g. 'prs/pr12')
+        pr_titles: PR titles keyed by PR number
+        
+    Returns:
+        Structure entry, or None if no language has an index.html
+    """
+    languages = _scan_languages(pr_dir)
+    
+    # Extract PR number and get title
+    pr_num = os.path.basename(pr_dir).replace("pr", "")
+    pr_title = pr_titles.get(int(pr_num), f"PR #{pr_num}") if pr_num.isdigit() else f"PR #{pr_num}"
+    
+    # Only add to structure if at least one language has an index.html
+    if not any(languages.values()):
+        return None
+    return {
+        'languages': languages,
+        'title': pr_title,
+        'number': pr_num  # Store PR number for creating the link
+    }
+
+
+def _scan_release(release_dir: str) -> Optional[Dict[str, Any]]:
+    """Build the structure entry of a release directory.
+    
+    Args:
+        release_dir: Path of the release directory (e.g. 'releases/v1.0.0')
+        
+    Returns:
+        Structure entry, or None if no language has an index.html
+    """
+    languages = _scan_languages(release_dir)
+    
+    # Only add to structure if at least one language has an index.html
+    if not any(languages.values()):
+        return None
+    return {'languages': languages}
+
+
+def _natural_key(name: str) -> List[Any]:
+    """Sort key that orders embedded numbers numerically ('pr9' < 'pr10')."""
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', name)]
+
+
+def sort_structure(structure: Dict[str, Any]) -> Dict[str, Any]:
+    """Order PRs and releases deterministically, independent of how they were found.
+    
+    Args:
+        structure: Dictionary with the directory structure
+        
+    Returns:
+        The same structure, with sorted 'prs' and 'releases'
+    """
+    for section in ('prs', 'releases'):
+        structure[section] = {name: structure[section][name]
+                              for name in sorted(structure[section], key=_natural_key)}
+    return structure
+
+
+def scan_directory(base_path: str = '.', pr_titles: Optional[Dict[int, str]] = None,
+                   pr_cache_ttl: Optional[int] = None) -> Dict[str, Any]:
     """Scan the directory structure and return a dictionary with the structure.
     
+    The tree is walked once with os.scandir, reusing the entry type
+    information; the only stat left is the index.html of each language build.
+    
     Args:
         base_path: Base path to scan
+        pr_titles: PR titles keyed by PR number; read from the PR cache if not given
+        pr_cache_ttl: Time-to-live in seconds of cached titles of open PRs (default: PR_CACHE_TTL)
         
     Returns:
         Dictionary with the directory structure
@@ -37,7 +173,7 @@ def scan_directory(base_path: str = '.') -> Dict[str, Any]:
     structure = {
         'versione-corrente': {
             'exists': False,
-            'languages': {'it': False, 'en': False}
+            'languages': dict.fromkeys(DEFAULT_LANGUAGES, False)
         },
         'prs': {},
         'releases': {}
@@ -46,120 +182,303 @@ def scan_directory(base_path: str = '.') -> Dict[str, Any]:
     base_path = Path(base_path)
     logger.info(f"Scanning directory structure at: {base_path}")
     
+    top_dirs = {entry.name: entry for entry in _list_subdirs(base_path)}
+    
     # Check versione-corrente
-    versione_corrente_path = base_path / "versione-corrente"
-    if versione_corrente_path.exists():
+    if "versione-corrente" in top_dirs:
         structure['versione-corrente']['exists'] = True
-        
-        # Check languages
-        for lang in ['it', 'en']:
-            lang_path = versione_corrente_path / lang
-            index_path = lang_path / "index.html"
-            structure['versione-corrente']['languages'][lang] = index_path.exists()
+        structure['versione-corrente']['languages'] = _scan_languages(top_dirs["versione-corrente"].path)
     
     # Check PRs
-    prs_path = base_path / "prs"
-    if prs_path.exists():
+    if "prs" in top_dirs:
         try:
-            pr_dirs = [d for d in prs_path.iterdir() if d.is_dir()]
+            pr_dirs = [d for d in _list_subdirs(top_dirs["prs"].path) if d.name.startswith('pr')]
+            
+            # Titles come from the on-disk cache; GitHub is only queried for
+            # missing or expired entries
+            if pr_titles is None:
+                pr_nums = [int(d.name[2:]) for d in pr_dirs if d.name[2:].isdigit()]
+                with get_tracer("generate_index").span("fetch PR titles", prs=len(pr_nums)):
+                    pr_titles = get_cached_pr_titles(pr_nums, base_path / PR_CACHE_FILE, pr_cache_ttl) if pr_nums else {}
             
             for pr_dir in pr_dirs:
-                pr_dir_name = pr_dir.name
-                if not pr_dir_name.startswith('pr'):
-                    continue
-                    
-                languages = {}
-                
-                # Check languages
-                for lang in ['it', 'en']:
-                    lang_path = pr_dir / lang
-                    index_path = lang_path / "index.html"
-                    languages[lang] = index_path.exists()
-                
-                # Extract PR number and get title
-                pr_num = pr_dir_name.replace("pr", "")
-                pr_info = get_pr_info(pr_num)
-                pr_title = pr_info.get('title', f"PR #{pr_num}") if pr_info else f"PR #{pr_num}"
-
-                # Only add to structure if at least one language has an index.html
-                if languages['it'] or languages['en']:
-                    structure['prs'][pr_dir_name] = {
-                        'languages': languages,
-                        'title': pr_title,
-                        'number': pr_num  # Store PR number for creating the link
-                    }
+                entry = _scan_pr(pr_dir.path, pr_titles)
+                if entry:
+                    structure['prs'][pr_dir.name] = entry
         except Exception as e:
             logger.error(f"Error scanning PRs: {e}")
     
     # Check Releases
-    releases_path = base_path / "releases"
-    if releases_path.exists():
+    if "releases" in top_dirs:
         try:
-            release_dirs = [d for d in releases_path.iterdir() if d.is_dir()]
-            
-            for release_dir in release_dirs:
-                release_dir_name = release_dir.name
-                languages = {}
-                
-                # Check languages
-                for lang in ['it', 'en']:
-                    lang_path = release_dir / lang
-                    index_path = lang_path / "index.html"
-                    languages[lang] = index_path.exists()
-                    
-                # Only add to structure if at least one language has an index.html
-                if languages['it'] or languages['en']:
-                    structure['releases'][release_dir_name] = {
-                        'languages': languages
-                    }
+            for release_dir in _list_subdirs(top_dirs["releases"].path):
+                entry = _scan_release(release_dir.path)
+                if entry:
+                    structure['releases'][release_dir.name] = entry
         except Exception as e:
             logger.error(f"Error scanning releases: {e}")
     
+    return sort_structure(structure)
+
+
+def load_index_state(state_path: Path) -> Optional[Dict[str, Any]]:
+    """Load the structure saved by a previous run.
+    
+    Args:
+        state_path: Path to the state file
+        
+    Returns:
+        The saved structure, or None if the state is missing, corrupt or outdated
+    """
+    try:
+        with open(state_path, encoding="utf-8") as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        logger.info(f"No index state found at {state_path}")
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable index state {state_path}: {e}")
+        return None
+    
+    if not isinstance(state, dict):
+        logger.warning(f"Ignoring incompatible index state {state_path}")
+        return None
+    structure = state.get('structure')
+    if (state.get('version') != INDEX_STATE_VERSION or not isinstance(structure, dict)
+            or not all(isinstance(structure.get(k), dict) for k in ('versione-corrente', 'prs', 'releases'))):
+        logger.warning(f"Ignoring incompatible index state {state_path}")
+        return None
     return structure
 
 
-def generate_html(structure: Dict[str, Any]) -> str:
+def save_index_state(state_path: Path, structure: Dict[str, Any]) -> None:
+    """Persist the structure for the next incremental update.
+    
+    Args:
+        state_path: Path to the state file
+        structure: Dictionary with the directory structure
+    """
+    tmp_path = state_path.with_name(state_path.name + ".tmp")
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({'version': INDEX_STATE_VERSION, 'structure': structure}, f, indent=2)
+        os.replace(tmp_path, state_path)
+    except OSError as e:
+        logger.error(f"Error writing index state {state_path}: {e}")
+
+
+def update_structure(structure: Dict[str, Any], base_path: str, added: Sequence[str] = (),
+                     removed: Sequence[str] = (), pr_titles: Optional[Dict[int, str]] = None,
+                     pr_cache_ttl: Optional[int] = None) -> Dict[str, Any]:
+    """Patch a saved structure with the deployment directories that changed.
+    
+    The titles of all PRs are then refreshed as scan_directory does (from the
+    PR cache, expired entries of open PRs queried again), so the result is the
+    same as a full scan of the tree.
+    
+    Args:
+        structure: Structure saved by a previous run
+        base_path: Base path of the gh-pages tree
+        added: Added or updated directories (e.g. 'prs/pr42', 'releases/v1.0', 'versione-corrente')
+        removed: Removed directories
+        pr_titles: PR titles keyed by PR number; read from the PR cache if not given
+        pr_cache_ttl: Time-to-live in seconds of cached titles of open PRs (default: PR_CACHE_TTL)
+        
+    Returns:
+        The updated structure
+        
+    Raises:
+        ValueError: If a path is not a deployment directory
+    """
+    base_path = Path(base_path)
+    
+    for rel_path in list(removed) + list(added):
+        parts = Path(rel_path).parts
+        is_added = rel_path in added
+        
+        if parts == ("versione-corrente",):
+            path = base_path / "versione-corrente"
+            structure['versione-corrente'] = {
+                'exists': is_added and path.is_dir(),
+                'languages': _scan_languages(str(path)) if is_added else dict.fromkeys(DEFAULT_LANGUAGES, False)
+            }
+        elif len(parts) == 2 and parts[0] == "prs" and parts[1].startswith("pr"):
+            structure['prs'].pop(parts[1], None)
+            if is_added:
+                # Titles are filled in below, with those of the other PRs
+                entry = _scan_pr(str(base_path / rel_path), {})
+                if entry:
+                    structure['prs'][parts[1]] = entry
+        elif len(parts) == 2 and parts[0] == "releases":
+            structure['releases'].pop(parts[1], None)
+            if is_added:
+                entry = _scan_release(str(base_path / rel_path))
+                if entry:
+                    structure['releases'][parts[1]] = entry
+        else:
+            raise ValueError(f"Not a deployment directory: {rel_path}")
+    
+    if pr_titles is None:
+        pr_nums = [int(entry['number']) for entry in structure['prs'].values() if entry['number'].isdigit()]
+        with get_tracer("generate_index").span("fetch PR titles", prs=len(pr_nums)):
+            pr_titles = get_cached_pr_titles(pr_nums, base_path / PR_CACHE_FILE, pr_cache_ttl) if pr_nums else {}
+    for entry in structure['prs'].values():
+        pr_num = entry['number']
+        entry['title'] = pr_titles.get(int(pr_num), f"PR #{pr_num}") if pr_num.isdigit() else f"PR #{pr_num}"
+    
+    return sort_structure(structure)
+
+
+@lru_cache(maxsize=None)
+def get_template_environment() -> Environment:
+    """Get the Jinja2 environment, built once per process.
+    
+    Compiled templates are stored in a bytecode cache (in INDEX_TEMPLATE_CACHE_DIR
+    if set, otherwise in the system temporary directory), so later processes
+    skip parsing the template too.
+    
+    Returns:
+        Jinja2 environment for the templates directory
+    """
+    template_dir = GITHUB_DIR / "templates"
+    cache_dir = os.environ.get('INDEX_TEMPLATE_CACHE_DIR')
+    bytecode_cache = FileSystemBytecodeCache(cache_dir) if cache_dir else FileSystemBytecodeCache()
+    return Environment(
+        loader=FileSystemLoader(template_dir),
+        bytecode_cache=bytecode_cache,
+        auto_reload=False
+    )
+
+
+def get_index_template() -> Template:
+    """Get the compiled index template (cached by the environment).
+    
+    Returns:
+        Jinja2 template for index.html
+    """
+    return get_template_environment().get_template(INDEX_TEMPLATE)
+
+
+def _template_context(structure: Dict[str, Any], search: bool = False) -> Dict[str, Any]:
+    """Prepare template data.
+    
+    Args:
+        structure: Dictionary with the directory structure
+        search: Whether to show the search box (a search index was written)
+        
+    Returns:
+        Template variables
+    """
+    return {
+        'structure': structure,
+        'search': search,
+        'search_index': SEARCH_INDEX_FILE,
+        'current_date': datetime.now().strftime("%Y-%m-%d"),
+        'repo': get_github_repo() or ""
+    }
+
+
+def generate_html(structure: Dict[str, Any], search: bool = False) -> str:
     """Generate HTML content based on the directory structure using external Jinja2 template.
     
     Args:
         structure: Dictionary with the directory structure
+        search: Whether to show the search box
         
     Returns:
         HTML content
     """
-    # Set up Jinja2 environment with templates directory
-    template_dir = GITHUB_DIR / "templates"
-    env = Environment(loader=FileSystemLoader(template_dir))
-    template = env.get_template("index-template.html")
+    return get_index_template().render(**_template_context(structure, search))
+
+
+def write_html(structure: Dict[str, Any], index_path: Path, search: bool = False) -> None:
+    """Render the index template straight into a file, without building the full HTML string.
     
-    # Prepare template data
-    current_date = datetime.now().strftime("%Y-%m-%d")
-    repo = get_github_repo() or ""
+    The output is written to a temporary file and moved into place, so
+    readers never see a partially written index.
     
-    # Render template
-    return template.render(structure=structure, current_date=current_date, repo=repo)
+    Args:
+        structure: Dictionary with the directory structure
+        index_path: Path of the HTML file to write
+        search: Whether to show the search box
+    """
+    tmp_path = index_path.with_name(index_path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for chunk in get_index_template().generate(**_template_context(structure, search)):
+            f.write(chunk)
+    os.replace(tmp_path, index_path)
 
 
-def main() -> None:
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """Parse command line arguments.
+    
+    Args:
+        argv: Arguments (defaults to sys.argv[1:])
+        
+    Returns:
+        Parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="Generate the gh-pages index.html")
+    parser.add_argument("--added", nargs="+", default=[], metavar="PATH",
+                        help="deployment directories added or updated since the last run (e.g. prs/pr42)")
+    parser.add_argument("--removed", nargs="+", default=[], metavar="PATH",
+                        help="deployment directories removed since the last run (e.g. prs/pr17)")
+    parser.add_argument("--full", action="store_true",
+                        help="ignore the saved index state and search index, rescan and re-read everything")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
     """Main function to scan directories and generate index.html in the GitHub directory level."""
+    args = parse_args(argv)
+    tracer = get_tracer("generate_index")
+    
     # Get output directory (GITHUB_DIR)
     output_dir = GITHUB_DIR
+    state_path = output_dir / INDEX_STATE_FILE
+    
+    # Patch the saved structure when only a few directories changed,
+    # otherwise scan the current directory (we're in the root of gh-pages)
+    structure = None
+    if (args.added or args.removed) and not args.full:
+        structure = load_index_state(state_path)
+        if structure is not None:
+            try:
+                with tracer.span("update index state"):
+                    structure = update_structure(structure, output_dir, args.added, args.removed)
+                logger.info(f"Updated index state: {len(args.added)} added, {len(args.removed)} removed")
+            except ValueError as e:
+                logger.warning(f"{e}; falling back to a full scan")
+                structure = None
+    if structure is None:
+        with tracer.span("scan directories"):
+            structure = scan_directory(output_dir)
+    save_index_state(state_path, structure)
     
-    # Scan the current directory (we're in the root of gh-pages)
-    structure = scan_directory(output_dir)
     logger.info("Directory structure found:")
     logger.info(f"versione-corrente: {structure['versione-corrente']}")
     logger.info(f"PRs: {len(structure['prs'])} found")
     logger.info(f"Releases: {len(structure['releases'])} found")
     
-    # Generate HTML content
-    html_content = generate_html(structure)
+    # Merge the search indexes, re-reading only those that changed
+    search_path = output_dir / SEARCH_INDEX_FILE
+    search = False
+    try:
+        with tracer.span("update search index"):
+            previous = None if args.full else load_search_index(search_path)
+            search_index, read_count = update_search_index(output_dir, structure, previous)
+        save_search_index(search_path, search_index)
+        search = bool(search_index['docs'])
+        logger.info(f"Search index: {len(search_index['docs'])} documents from "
+                    f"{len(search_index['builds'])} builds ({read_count} read again)")
+    except Exception as e:
+        logger.error(f"Error updating the search index: {e}")
     
-    # Write the HTML to index.html in the output directory
+    # Render the HTML straight to index.html in the output directory
     index_path = output_dir / "index.html"
     try:
-        with open(index_path, "w", encoding="utf-8") as f:
-            f.write(html_content)
+        with tracer.span("render index.html"):
+            write_html(structure, index_path, search)
         logger.info(f"Generated index.html successfully at {index_path}")
     except Exception as e:
         logger.error(f"Error writing index.html: {e}")
@@ -0,0 +1,145 @@
+"""
+Persistent cache of PR metadata used when generating the index.
+
+The cache is a JSON file in the gh-pages root, keyed by PR number. Each entry
+stores the PR title, its state and the time it was fetched. Closed and merged
+PRs never change, so their entries never expire; open PRs are refreshed once
+their entry is older than the configured TTL (PR_CACHE_TTL environment
+variable, in seconds, default one hour).
+"""
+import os
+import json
+import time
+import logging
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional
+from common_utils import get_pr_info_many, get_prs_info
+
+logger = logging.getLogger(__name__)
+
+# Cache file name, relative to the gh-pages root
+PR_CACHE_FILE = "pr-cache.json"
+
+# Default time-to-live (seconds) for entries of open PRs, see get_default_ttl()
+DEFAULT_TTL = 3600
+
+PR_FIELDS = "number,title,state"
+
+
+def load_pr_cache(cache_path: Path) -> Dict[str, Dict[str, Any]]:
+    """Load the PR cache from disk.
+    
+    Args:
+        cache_path: Path to the cache file
+        
+    Returns:
+        Cache entries keyed by PR number (as string), empty if missing or corrupt
+    """
+    try:
+        with open(cache_path, encoding="utf-8") as f:
+            cache = json.load(f)
+        return cache if isinstance(cache, dict) else {}
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable PR cache {cache_path}: {e}")
+        return {}
+
+
+def save_pr_cache(cache_path: Path, cache: Dict[str, Dict[str, Any]]) -> None:
+    """Write the PR cache to disk atomically.
+    
+    Args:
+        cache_path: Path to the cache file
+        cache: Cache entries keyed by PR number (as string)
+    """
+    tmp_path = cache_path.with_name(cache_path.name + ".tmp")
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(cache, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logger.error(f"Error writing PR cache {cache_path}: {e}")
+
+
+def is_fresh(entry: Dict[str, Any], ttl: int, now: Optional[float] = None) -> bool:
+    """Check whether a cache entry can be used without querying GitHub.
+    
+    Args:
+        entry: Cache entry
+        ttl: Time-to-live in seconds for open PRs
+        now: Current time (defaults to time.time())
+        
+    Returns:
+        True if the entry is still valid, False otherwise
+    """
+    if 'title' not in entry:
+        return False
+    if entry.get('state', 'OPEN') != 'OPEN':
+        return True
+    now = time.time() if now is None else now
+    return now - entry.get('fetched_at', 0) < ttl
+
+
+def get_default_ttl() -> int:
+    """Get the time-to-live of open PR entries from PR_CACHE_TTL.
+    
+    Returns:
+        The TTL in seconds, DEFAULT_TTL if the variable is unset or invalid
+    """
+    value = os.environ.get('PR_CACHE_TTL', '').strip()
+    if not value:
+        return DEFAULT_TTL
+    try:
+        ttl = int(value)
+    except ValueError:
+        ttl = -1
+    if ttl < 0:
+        logger.warning(f"Ignoring invalid PR_CACHE_TTL={value!r}, using {DEFAULT_TTL}s")
+        return DEFAULT_TTL
+    return ttl
+
+
+def _make_entry(pr_info: Dict[str, Any], now: float) -> Dict[str, Any]:
+    return {
+        'title': pr_info.get('title', ''),
+        'state': pr_info.get('state', 'OPEN'),
+        'fetched_at': now,
+    }
+
+
+def get_cached_pr_titles(pr_nums: Iterable[int], cache_path: Path, ttl: Optional[int] = None) -> Dict[int, str]:
+    """Get the titles of the given PRs, querying GitHub only for stale entries.
+    
+    Missing and expired entries are refreshed with a single bulk request; PRs
+    still missing after that are queried individually, concurrently.
+    
+    Args:
+        pr_nums: PR numbers to resolve
+        cache_path: Path to the cache file
+        ttl: Time-to-live in seconds for open PRs (default: get_default_ttl())
+        
+    Returns:
+        Dictionary mapping PR numbers to titles (only PRs that could be resolved)
+    """
+    pr_nums = list(pr_nums)  # iterated twice
+    ttl = get_default_ttl() if ttl is None else ttl
+    cache = load_pr_cache(cache_path)
+    now = time.time()
+
+    stale: List[int] = [n for n in pr_nums if not is_fresh(cache.get(str(n), {}), ttl, now)]
+    if stale:
+        logger.info(f"PR cache: {len(stale)} missing or expired entries, querying GitHub")
+        prs_info = get_prs_info(PR_FIELDS)
+        missing = [n for n in stale if n not in prs_info]
+        for pr_num, pr_info in zip(missing, get_pr_info_many(missing, PR_FIELDS)):
+            if pr_info:
+                prs_info[pr_num] = pr_info
+        for pr_num in stale:
+            if pr_num in prs_info:
+                cache[str(pr_num)] = _make_entry(prs_info[pr_num], now)
+        save_pr_cache(cache_path, cache)
+    else:
+        logger.info("PR cache: all entries are up to date")
+
+    return {n: cache[str(n)]['title'] for n in pr_nums if str(n) in cache}
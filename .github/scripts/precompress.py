@@ -0,0 +1,278 @@
+"""
+Write precompressed .gz and .br sidecars next to the files of a build.
+
+Readers on slow links load searchindex.js, the Redoc bundle and the large
+HTML pages uncompressed. Run after sphinx-build (and dedupe_assets.py) and
+before publish.py, this script writes <file>.gz and, if the optional brotli
+package is installed, <file>.br next to every text file of each deployment
+path, so that servers able to serve precompressed files can use them. Paths
+may also be single files: the root index.html and search-index.json are
+compressed in the gh-pages checkout once generate_index.py has written them.
+
+- Files smaller than --min-size are skipped, and a sidecar is only kept if it
+  saves at least --min-gain of the original size
+- Files are compressed in parallel, one process per CPU
+- Results are cached in --cache-dir by content hash, compressor (level and
+  library version) and --min-gain, so files that did not change since the
+  last run are not compressed again
+- The bytes saved are reported for each deployment path
+
+Usage:
+    python precompress.py --site html --cache-dir build/precompress prs/pr42 _assets
+    python precompress.py --site gh-pages-temp index.html search-index.json
+"""
+import os
+import sys
+import gzip
+import zlib
+import hashlib
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from build_trace import get_tracer
+
+try:
+    import brotli
+except ImportError:  # optional: only .gz sidecars without it
+    brotli = None
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Text formats worth compressing (images, fonts and objects.inv already are)
+COMPRESSIBLE_SUFFIXES = {'.html', '.js', '.css', '.json', '.svg', '.txt', '.xml', '.map'}
+
+# Suffixes of the sidecar files, by format
+SIDECAR_SUFFIXES = {'gzip': '.gz', 'brotli': '.br'}
+
+# Compression level of each format (the highest)
+COMPRESSION_LEVELS = {'gzip': 9, 'brotli': 11}
+
+# Files smaller than this are not compressed (bytes)
+DEFAULT_MIN_SIZE = 1024
+
+# Minimum fraction of the original size a sidecar must save
+DEFAULT_MIN_GAIN = 0.1
+
+# Size above which the least recently used cache entries are evicted (bytes)
+DEFAULT_CACHE_MAX_SIZE = 200 * 1024 * 1024
+
+
+def available_formats() -> List[str]:
+    """Sidecar formats that can be written with the installed packages."""
+    return ['gzip', 'brotli'] if brotli is not None else ['gzip']
+
+
+def compress(data: bytes, fmt: str) -> bytes:
+    """Compress data at the highest level (deterministic output)."""
+    if fmt == 'brotli':
+        return brotli.compress(data, quality=COMPRESSION_LEVELS['brotli'])
+    return gzip.compress(data, compresslevel=COMPRESSION_LEVELS['gzip'], mtime=0)
+
+
+def compressor_id(fmt: str) -> str:
+    """Format, level and library version: what the output of compress() depends on."""
+    if fmt == 'brotli':
+        version = getattr(brotli, '__version__', 'unknown')
+    else:
+        version = zlib.ZLIB_RUNTIME_VERSION
+    return f"{fmt}-{COMPRESSION_LEVELS[fmt]}-{version}"
+
+
+def cache_key(content_digest: str, fmt: str, min_gain: float) -> str:
+    """Key of a cache entry: the content, the compressor and the gain threshold."""
+    return hashlib.sha256(f"{content_digest}\0{compressor_id(fmt)}\0{min_gain!r}".encode('utf-8')).hexdigest()
+
+
+def _cache_path(cache_dir: Path, key: str, fmt: str) -> Path:
+    return cache_dir / key[:2] / f"{key}{SIDECAR_SUFFIXES[fmt]}"
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+def precompress_file(path: Path, formats: List[str], cache_dir: Optional[Path],
+                     min_gain: float) -> Tuple[int, Dict[str, Optional[int]], int]:
+    """Write the sidecars of one file.
+
+    Args:
+        path: File to compress
+        formats: Sidecar formats to write
+        cache_dir: Cache of compressed files (see cache_key()), None to disable
+        min_gain: Minimum fraction of the size a sidecar must save
+
+    Returns:
+        Tuple (original size, sidecar size by format or None if not worth it,
+        number of formats taken from the cache)
+    """
+    data = path.read_bytes()
+    digest = hashlib.sha256(data).hexdigest()
+    sizes = {}
+    cached = 0
+    for fmt in formats:
+        sidecar = path.with_name(path.name + SIDECAR_SUFFIXES[fmt])
+        cache_file = _cache_path(cache_dir, cache_key(digest, fmt, min_gain), fmt) if cache_dir else None
+        skip_file = cache_file.with_name(cache_file.name + ".skip") if cache_file else None
+
+        compressed = None
+        if cache_file and cache_file.is_file():
+            compressed = cache_file.read_bytes()
+            os.utime(cache_file)  # recently used, see evict_cache()
+            cached += 1
+        elif skip_file and skip_file.is_file():
+            os.utime(skip_file)
+            cached += 1
+        else:
+            compressed = compress(data, fmt)
+            if len(compressed) > len(data) * (1 - min_gain):
+                compressed = None
+            if cache_file:
+                if compressed is None:
+                    _write_atomic(skip_file, b'')
+                else:
+                    _write_atomic(cache_file, compressed)
+
+        if compressed is None:
+            # Not worth it (any more): no stale sidecar left behind
+            sidecar.unlink(missing_ok=True)
+            sizes[fmt] = None
+        else:
+            _write_atomic(sidecar, compressed)
+            sizes[fmt] = len(compressed)
+    return len(data), sizes, cached
+
+
+def evict_cache(cache_dir: Path, max_size: int) -> int:
+    """Delete the least recently used cache entries above max_size.
+
+    Returns:
+        Size of the cache afterwards, in bytes
+    """
+    entries = []
+    for path in cache_dir.glob("*/*"):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_size:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+    return total
+
+
+def find_files(root: Path, min_size: int) -> List[Path]:
+    """Files of a deployment path (or the file itself) worth compressing."""
+    if root.is_file():
+        return [root] if root.suffix in COMPRESSIBLE_SUFFIXES and root.stat().st_size >= min_size else []
+    files = []
+    for dirpath, _dirnames, filenames in os.walk(root):
+        for name in filenames:
+            path = Path(dirpath) / name
+            if path.suffix in COMPRESSIBLE_SUFFIXES and path.stat().st_size >= min_size:
+                files.append(path)
+    return sorted(files)
+
+
+def precompress_paths(site_dir: Path, paths: List[str], cache_dir: Optional[Path] = None,
+                      min_size: int = DEFAULT_MIN_SIZE, min_gain: float = DEFAULT_MIN_GAIN,
+                      jobs: Optional[int] = None) -> Dict[str, Dict[str, int]]:
+    """Write the sidecars of every deployment path.
+
+    Args:
+        site_dir: Root of the site (e.g. html/)
+        paths: Deployment paths (directories or files) relative to site_dir
+        cache_dir: Cache of compressed files by content hash, None to disable
+        min_size: Files smaller than this are skipped
+        min_gain: Minimum fraction of the size a sidecar must save
+        jobs: Number of worker processes (default: one per CPU)
+
+    Returns:
+        Statistics by deployment path: 'files', 'bytes', 'cached' and the
+        bytes saved by each format
+    """
+    formats = available_formats()
+    tasks = [(rel_path, path) for rel_path in paths for path in find_files(site_dir / rel_path, min_size)]
+    stats = {rel_path: dict(files=0, bytes=0, cached=0, **dict.fromkeys(formats, 0)) for rel_path in paths}
+    if not tasks:
+        return stats
+
+    with ProcessPoolExecutor(max_workers=max(1, min(jobs or os.cpu_count() or 1, len(tasks)))) as executor:
+        futures = [(rel_path, executor.submit(precompress_file, path, formats, cache_dir, min_gain))
+                   for rel_path, path in tasks]
+        for rel_path, future in futures:
+            size, sizes, cached = future.result()
+            path_stats = stats[rel_path]
+            path_stats['files'] += 1
+            path_stats['bytes'] += size
+            path_stats['cached'] += cached
+            for fmt, compressed_size in sizes.items():
+                if compressed_size is not None:
+                    path_stats[fmt] += size - compressed_size
+    return stats
+
+
+def print_report(stats: Dict[str, Dict[str, int]]) -> None:
+    """Print the bytes saved by the sidecars of each deployment path."""
+    formats = available_formats()
+    print("===== Precompressed sidecars =====")
+    for rel_path, path_stats in stats.items():
+        total = path_stats['bytes']
+        saved = "; ".join(f"{fmt} saves {path_stats[fmt] / 1024:.0f} KiB ({path_stats[fmt] / total if total else 0:.0%})"
+                          for fmt in formats)
+        print(f"  {rel_path}: {path_stats['files']} files, {total / 1024:.0f} KiB; {saved}; "
+              f"{path_stats['cached']} results from the cache")
+
+
+def main() -> int:
+    """Write the sidecars of the given deployment paths and report the savings."""
+    parser = argparse.ArgumentParser(description="Write .gz and .br sidecars next to the files of a build")
+    parser.add_argument("--site", default="html", help="root of the site (default: html)")
+    parser.add_argument("--cache-dir", help="cache of compressed files by content hash and settings")
+    parser.add_argument("--min-size", type=int, default=DEFAULT_MIN_SIZE,
+                        help=f"skip files smaller than this many bytes (default: {DEFAULT_MIN_SIZE})")
+    parser.add_argument("--min-gain", type=float, default=DEFAULT_MIN_GAIN,
+                        help=f"minimum fraction of the size a sidecar must save (default: {DEFAULT_MIN_GAIN})")
+    parser.add_argument("--cache-max-size", type=int, default=DEFAULT_CACHE_MAX_SIZE,
+                        help=f"evict the least recently used cache entries above this many bytes "
+                             f"(default: {DEFAULT_CACHE_MAX_SIZE})")
+    parser.add_argument("-j", "--jobs", type=int, help="number of worker processes (default: one per CPU)")
+    parser.add_argument("paths", nargs="+",
+                        help="deployment paths or files relative to the site root, e.g. prs/pr42 index.html")
+    args = parser.parse_args()
+
+    if brotli is None:
+        logger.warning("brotli is not installed: writing .gz sidecars only (pip install Brotli)")
+
+    site_dir = Path(args.site)
+    paths = [Path(rel_path).as_posix().strip("/") for rel_path in args.paths]
+    for rel_path in paths:
+        if not (site_dir / rel_path).exists():
+            logger.warning(f"Nothing to compress for {rel_path}: {site_dir / rel_path} does not exist")
+    paths = [rel_path for rel_path in paths if (site_dir / rel_path).exists()]
+    cache_dir = Path(args.cache_dir).resolve() if args.cache_dir else None
+
+    with get_tracer("precompress").span("precompress", paths=len(paths)):
+        stats = precompress_paths(site_dir, paths, cache_dir, args.min_size, args.min_gain, args.jobs)
+    print_report(stats)
+    if cache_dir and cache_dir.is_dir():
+        size = evict_cache(cache_dir, args.cache_max_size)
+        logger.info(f"Cache {cache_dir}: {size / (1024 * 1024):.1f} MiB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,265 @@
+"""
+Publish a documentation build into the gh-pages checkout.
+
+Replaces 'rsync -av html/ gh-pages-temp/' followed by 'git add .', which made
+git stat and re-hash every file of every preview and release. For each
+deployment path this script:
+1. Hashes the files of the new build into a manifest
+2. Compares it with the manifest stored with the previous deployment of that
+   path (<path>/.publish-manifest.json)
+3. Copies only the changed files and removes the ones that disappeared
+4. Stages exactly those paths with a single 'git add'
+
+Paths given with --shared hold immutable, content-addressed files shared by
+several deployments (the _assets/ store of dedupe_assets.py): new files are
+added, nothing is ever removed there (cleanup_old_prs.py trims the store).
+
+Usage:
+    python publish.py --source html --target gh-pages-temp prs/pr42 scripts templates static --shared _assets
+"""
+import os
+import sys
+import json
+import shutil
+import hashlib
+import logging
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from build_trace import get_tracer
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Manifest of a deployment path, stored inside it on gh-pages
+MANIFEST_NAME = ".publish-manifest.json"
+
+# Number of threads hashing files
+MAX_HASH_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+
+def hash_file(path: Path) -> str:
+    """Get the SHA-256 of a file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def build_manifest(root: Path) -> Dict[str, str]:
+    """Hash every file under a directory.
+
+    Args:
+        root: Directory to scan (the manifest file itself is skipped)
+
+    Returns:
+        Dictionary mapping POSIX paths relative to root to their SHA-256
+    """
+    files = []
+    for dirpath, _dirnames, filenames in os.walk(root):
+        for name in filenames:
+            path = Path(dirpath) / name
+            rel_path = path.relative_to(root).as_posix()
+            if rel_path != MANIFEST_NAME:
+                files.append((rel_path, path))
+
+    with ThreadPoolExecutor(max_workers=MAX_HASH_WORKERS) as executor:
+        digests = executor.map(hash_file, [path for _, path in files])
+        return dict(zip([rel_path for rel_path, _ in files], digests))
+
+
+def load_manifest(path: Path) -> Optional[Dict[str, str]]:
+    """Load a stored manifest, None if missing or unreadable."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        return manifest if isinstance(manifest, dict) else None
+    except (OSError, ValueError):
+        return None
+
+
+def save_manifest(path: Path, manifest: Dict[str, str]) -> None:
+    """Write a manifest atomically."""
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=0, sort_keys=True), encoding='utf-8')
+    os.replace(tmp_path, path)
+
+
+def diff_manifests(old: Dict[str, str], new: Dict[str, str], target_dir: Path) -> Tuple[List[str], List[str]]:
+    """Compare the previous deployment with the new build.
+
+    Args:
+        old: Manifest of the previous deployment
+        new: Manifest of the new build
+        target_dir: Deployed directory, to notice files missing from it
+
+    Returns:
+        Tuple (changed, removed) of relative paths, sorted
+    """
+    changed = [rel_path for rel_path, digest in new.items()
+               if old.get(rel_path) != digest or not (target_dir / rel_path).is_file()]
+    removed = [rel_path for rel_path in old if rel_path not in new]
+    return sorted(changed), sorted(removed)
+
+
+def _remove_empty_parents(path: Path, stop: Path) -> None:
+    parent = path.parent
+    while parent != stop:
+        try:
+            parent.rmdir()
+        except OSError:
+            return
+        parent = parent.parent
+
+
+def publish_path(source_root: Path, target_root: Path, rel_path: str) -> List[str]:
+    """Bring one deployment path of the target up to date with the build.
+
+    Args:
+        source_root: Root of the build output (e.g. html/)
+        target_root: Root of the gh-pages checkout
+        rel_path: Deployment path, relative to both roots (e.g. prs/pr42)
+
+    Returns:
+        Paths relative to target_root that changed (to be staged)
+    """
+    source_dir = source_root / rel_path
+    target_dir = target_root / rel_path
+    if not source_dir.is_dir():
+        logger.warning(f"Nothing to publish for {rel_path}: {source_dir} does not exist")
+        return []
+
+    new = build_manifest(source_dir)
+    old = load_manifest(target_dir / MANIFEST_NAME)
+    if old is None:
+        # First publication with a manifest: compare with what is deployed
+        old = build_manifest(target_dir) if target_dir.is_dir() else {}
+
+    changed, removed = diff_manifests(old, new, target_dir)
+
+    for name in changed:
+        target = target_dir / name
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(source_dir / name, target)
+
+    for name in removed:
+        target = target_dir / name
+        try:
+            target.unlink()
+        except FileNotFoundError:
+            pass
+        _remove_empty_parents(target, target_dir)
+
+    target_dir.mkdir(parents=True, exist_ok=True)
+    staged = [f"{rel_path}/{name}" for name in changed + removed]
+    if changed or removed or not (target_dir / MANIFEST_NAME).is_file():
+        save_manifest(target_dir / MANIFEST_NAME, new)
+        staged.append(f"{rel_path}/{MANIFEST_NAME}")
+
+    logger.info(f"{rel_path}: {len(changed)} changed, {len(removed)} removed, "
+                f"{len(new) - len(changed)} unchanged")
+    return staged
+
+
+def publish_shared(source_root: Path, target_root: Path, rel_path: str) -> List[str]:
+    """Add the new files of a content-addressed directory to the target.
+
+    Files already in the target are identical by construction, so they are
+    neither hashed nor copied again, and files missing from the build are kept.
+
+    Args:
+        source_root: Root of the build output (e.g. html/)
+        target_root: Root of the gh-pages checkout
+        rel_path: Shared directory, relative to both roots (e.g. _assets)
+
+    Returns:
+        Paths relative to target_root that were added (to be staged)
+    """
+    source_dir = source_root / rel_path
+    target_dir = target_root / rel_path
+    if not source_dir.is_dir():
+        logger.warning(f"Nothing to publish for {rel_path}: {source_dir} does not exist")
+        return []
+
+    added = []
+    existing = 0
+    for dirpath, _dirnames, filenames in os.walk(source_dir):
+        for name in filenames:
+            source = Path(dirpath) / name
+            name = source.relative_to(source_dir).as_posix()
+            target = target_dir / name
+            if target.is_file():
+                existing += 1
+                continue
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(source, target)
+            added.append(f"{rel_path}/{name}")
+
+    logger.info(f"{rel_path}: {len(added)} added, {existing} already published")
+    return added
+
+
+def stage_paths(repo_dir: Path, paths: List[str]) -> bool:
+    """Stage exactly the given paths (added, modified or deleted) in one git call.
+
+    Args:
+        repo_dir: Root of the git checkout
+        paths: Paths relative to repo_dir
+
+    Returns:
+        True if git succeeded, False otherwise
+    """
+    if not paths:
+        return True
+    # Paths are passed on stdin (no command line limit) and taken literally
+    env = dict(os.environ, GIT_LITERAL_PATHSPECS="1")
+    result = subprocess.run(
+        ["git", "add", "--all", "--pathspec-from-file=-", "--pathspec-file-nul"],
+        cwd=repo_dir, input="\0".join(paths).encode('utf-8'), env=env,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    if result.returncode != 0:
+        logger.error(f"git add failed: {result.stderr.decode('utf-8', 'replace').strip()}")
+        return False
+    logger.info(f"Staged {len(paths)} paths")
+    return True
+
+
+def main() -> int:
+    """Publish the given deployment paths and stage the changes."""
+    parser = argparse.ArgumentParser(description="Copy changed files of a build into gh-pages and stage them")
+    parser.add_argument("--source", default="html", help="root of the build output (default: html)")
+    parser.add_argument("--target", default="gh-pages-temp", help="root of the gh-pages checkout")
+    parser.add_argument("--no-stage", action="store_true", help="only copy and remove files, do not run git")
+    parser.add_argument("--shared", action="append", default=[], metavar="PATH",
+                        help="content-addressed directory whose files are only ever added, e.g. _assets")
+    parser.add_argument("paths", nargs="*", help="deployment paths relative to both roots, e.g. prs/pr42")
+    args = parser.parse_args()
+
+    tracer = get_tracer("publish")
+    source_root, target_root = Path(args.source), Path(args.target)
+    staged = []
+    for rel_path in args.paths:
+        rel_path = Path(rel_path).as_posix().strip("/")
+        with tracer.span(f"publish {rel_path}"):
+            staged.extend(publish_path(source_root, target_root, rel_path))
+    for rel_path in args.shared:
+        rel_path = Path(rel_path).as_posix().strip("/")
+        with tracer.span(f"publish {rel_path}"):
+            staged.extend(publish_shared(source_root, target_root, rel_path))
+
+    if args.no_stage:
+        return 0
+    with tracer.span("git add", paths=len(staged)):
+        return 0 if stage_paths(target_root, staged) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+"""
+Unified search index of the published documentation.
+
+Each Sphinx build only searches itself. This module merges the searchindex.js
+files of versione-corrente and of every release, in both languages, into one
+compact JSON file in the gh-pages root, searched by static/search.js on the
+index page. Every document belongs to a build, which carries the version and
+language facets.
+
+Terms are kept as Sphinx stored them, i.e. stemmed by the stemmer of the
+language of the build; the client matches query words against them by prefix.
+
+The merged file records a stamp (size, mtime and SHA-256) of the
+searchindex.js of each build, so an update only re-reads the builds whose
+search index changed and takes the others from the previous merged index.
+"""
+import os
+import json
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Merged index, relative to the gh-pages root
+SEARCH_INDEX_FILE = "search-index.json"
+SEARCH_INDEX_VERSION = 1
+
+# Search index written by Sphinx in each HTML build
+SPHINX_INDEX_FILE = "searchindex.js"
+SPHINX_INDEX_PREFIX = "Search.setIndex("
+
+
+def list_search_builds(structure: Dict[str, Any]) -> List[Tuple[str, str, str]]:
+    """Builds covered by the unified search, from the index structure.
+
+    Args:
+        structure: Dictionary with the directory structure (see generate_index.py)
+
+    Returns:
+        List of (deployment path, version, language) tuples
+    """
+    builds = []
+    current = structure['versione-corrente']
+    if current['exists']:
+        builds.extend(("versione-corrente", "versione-corrente", language)
+                      for language, exists in current['languages'].items() if exists)
+    for release, entry in structure['releases'].items():
+        builds.extend((f"releases/{release}", release, language)
+                      for language, exists in entry['languages'].items() if exists)
+    return builds
+
+
+def read_sphinx_index(path: Path) -> Dict[str, Any]:
+    """Read the documents and terms of a Sphinx searchindex.js.
+
+    Args:
+        path: Path of the searchindex.js file
+
+    Returns:
+        Dictionary with 'docs' ([docname, title] pairs) and 'terms' and
+        'titleterms' (term -> list of document numbers)
+
+    Raises:
+        ValueError: If the file is not a Sphinx search index
+    """
+    text = path.read_text(encoding="utf-8").strip()
+    if not text.startswith(SPHINX_INDEX_PREFIX):
+        raise ValueError(f"{path} is not a Sphinx search index")
+    data = json.loads(text[len(SPHINX_INDEX_PREFIX):].rstrip(';').rstrip(')'))
+
+    def postings(terms: Dict[str, Any]) -> Dict[str, List[int]]:
+        # Sphinx stores a single document as a bare number
+        return {term: [docs] if isinstance(docs, int) else sorted(docs) for term, docs in terms.items()}
+
+    return {
+        'docs': [list(doc) for doc in zip(data['docnames'], data['titles'])],
+        'terms': postings(data.get('terms', {})),
+        'titleterms': postings(data.get('titleterms', {})),
+    }
+
+
+def file_stamp(path: Path, digest: Optional[str] = None) -> List[Any]:
+    """Stamp of a file: size, mtime and (if computed) SHA-256."""
+    stat = path.stat()
+    if digest is None:
+        digest = hashlib.sha256(path.read_bytes()).hexdigest()
+    return [stat.st_size, stat.st_mtime_ns, digest]
+
+
+def load_search_index(index_path: Path) -> Optional[Dict[str, Any]]:
+    """Load a merged index written by a previous run.
+
+    Args:
+        index_path: Path to the merged index
+
+    Returns:
+        The merged index, or None if missing, corrupt or outdated
+    """
+    try:
+        with open(index_path, encoding="utf-8") as f:
+            index = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable search index {index_path}: {e}")
+        return None
+    if not isinstance(index, dict) or index.get('version') != SEARCH_INDEX_VERSION:
+        logger.warning(f"Ignoring incompatible search index {index_path}")
+        return None
+    return index
+
+
+def save_search_index(index_path: Path, index: Dict[str, Any]) -> None:
+    """Write the merged index (compact JSON) atomically.
+
+    Args:
+        index_path: Path to the merged index
+        index: Merged index
+    """
+    tmp_path = index_path.with_name(index_path.name + ".tmp")
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, index_path)
+    except OSError as e:
+        logger.error(f"Error writing search index {index_path}: {e}")
+
+
+def split_index(index: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Split a merged index back into the entries of its builds.
+
+    Args:
+        index: Merged index
+
+    Returns:
+        Entries (as returned by read_sphinx_index, plus 'stamp') keyed by
+        '<deployment path>/<language>'
+
+    Raises:
+        ValueError: If builds, documents and terms do not match
+    """
+    entries = {}
+    owners = []  # (entry, number of the document in its build) by merged document number
+    try:
+        for build in index['builds']:
+            if not (isinstance(build['stamp'], list) and len(build['stamp']) == 3):
+                raise ValueError(f"invalid stamp {build['stamp']!r}")
+            entries[f"{build['path']}/{build['language']}"] = {
+                'stamp': build['stamp'], 'docs': [], 'terms': {}, 'titleterms': {}
+            }
+        builds = list(entries.values())
+        if len(builds) != len(index['builds']):
+            raise ValueError("duplicate builds")
+        for build_num, docname, title in index['docs']:
+            if not 0 <= build_num < len(builds):
+                raise ValueError(f"document {docname!r} of unknown build {build_num!r}")
+            entry = builds[build_num]
+            owners.append((entry, len(entry['docs'])))
+            entry['docs'].append([docname, title])
+        for section in ('terms', 'titleterms'):
+            for term, docs in index[section].items():
+                for doc in docs:
+                    if not 0 <= doc < len(owners):
+                        raise ValueError(f"term {term!r} points to unknown document {doc!r}")
+                    entry, local_doc = owners[doc]
+                    entry[section].setdefault(term, []).append(local_doc)
+    except (KeyError, IndexError, TypeError, AttributeError) as e:
+        raise ValueError(f"malformed search index: {e!r}") from e
+    return entries
+
+
+def merge_entries(builds: List[Tuple[str, str, str]], entries: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Merge the entries of the builds into one index.
+
+    Args:
+        builds: (deployment path, version, language) of each build, in order
+        entries: Entries keyed by '<deployment path>/<language>'
+
+    Returns:
+        Merged index
+    """
+    index = {'version': SEARCH_INDEX_VERSION, 'builds': [], 'docs': [], 'terms': {}, 'titleterms': {}}
+    for path, version, language in builds:
+        entry = entries.get(f"{path}/{language}")
+        if entry is None:
+            continue
+        build_num = len(index['builds'])
+        offset = len(index['docs'])
+        index['builds'].append({'path': path, 'version': version, 'language': language, 'stamp': entry['stamp']})
+        index['docs'].extend([build_num, docname, title] for docname, title in entry['docs'])
+        for section in ('terms', 'titleterms'):
+            merged = index[section]
+            for term, docs in entry[section].items():
+                merged.setdefault(term, []).extend(offset + doc for doc in docs)
+    return index
+
+
+def update_search_index(base_path: Path, structure: Dict[str, Any],
+                        previous: Optional[Dict[str, Any]] = None) -> Tuple[Dict[str, Any], int]:
+    """Build the merged index, re-reading only the search indexes that changed.
+
+    A build is reused from the previous index when its searchindex.js has the
+    same size and mtime, or else the same SHA-256 (e.g. after a fresh checkout).
+
+    Args:
+        base_path: Root of the gh-pages tree
+        structure: Dictionary with the directory structure
+        previous: Merged index of the previous run, if any
+
+    Returns:
+        Tuple (merged index, number of search indexes read)
+    """
+    old_entries = {}
+    if previous:
+        try:
+            old_entries = split_index(previous)
+        except ValueError as e:
+            logger.warning(f"Ignoring incompatible search index: {e}")
+    builds = list_search_builds(structure)
+    entries = {}
+    read_count = 0
+    for path, _version, language in builds:
+        key = f"{path}/{language}"
+        index_file = base_path / path / language / SPHINX_INDEX_FILE
+        if not index_file.is_file():
+            continue
+        old = old_entries.get(key)
+        stat = index_file.stat()
+        if old and old['stamp'][:2] == [stat.st_size, stat.st_mtime_ns]:
+            entries[key] = old
+            continue
+        stamp = file_stamp(index_file)
+        if old and old['stamp'][2] == stamp[2]:
+            entries[key] = dict(old, stamp=stamp)
+            continue
+        try:
+            entries[key] = dict(read_sphinx_index(index_file), stamp=stamp)
+            read_count += 1
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Skipping search index of {key}: {e}")
+    return merge_entries(builds, entries), read_count
@@ -0,0 +1,124 @@
+"""
+PR lookups of common_utils and pr_cache against a fake 'gh' executable.
+"""
+import json
+import os
+import stat
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import common_utils
+import pr_cache
+
+# Answers 'gh pr list' with the PRs of FAKE_GH_LISTED and 'gh pr view' with
+# those of FAKE_GH_PRS (after FAKE_GH_DELAY seconds), logging every call
+FAKE_GH = f"""#!{sys.executable}
+import json, os, sys, time
+args = sys.argv[1:]
+with open(os.environ['FAKE_GH_LOG'], 'a') as log:
+    log.write(' '.join(args) + '\\n')
+prs = json.loads(os.environ['FAKE_GH_PRS'])
+if args[:2] == ['pr', 'list']:
+    listed = os.environ.get('FAKE_GH_LISTED')
+    if listed is None:
+        sys.exit('HTTP 502')
+    limit = int(args[args.index('--limit') + 1]) if '--limit' in args else 30
+    numbers = json.loads(listed)[:limit]
+    print(json.dumps([dict(number=int(n), title=prs[n], state='OPEN') for n in numbers]))
+elif args[:2] == ['pr', 'view']:
+    time.sleep(float(os.environ.get('FAKE_GH_DELAY', '0')))
+    if args[2] not in prs:
+        sys.exit('no pull requests found')
+    print(json.dumps(dict(number=int(args[2]), title=prs[args[2]], state='MERGED')))
+else:
+    sys.exit('unexpected command')
+"""
+
+
+class FakeGhTest(unittest.TestCase):
+
+    PRS = {'1': "First", '2': "Second", '3': "Third", '4': "Fourth"}
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp_path = Path(tmp.name)
+        gh = self.tmp_path / "bin" / "gh"
+        gh.parent.mkdir()
+        gh.write_text(FAKE_GH, encoding="utf-8")
+        gh.chmod(gh.stat().st_mode | stat.S_IXUSR)
+        self.log_path = self.tmp_path / "gh.log"
+        self.log_path.touch()
+
+        env = {
+            'PATH': f"{gh.parent}{os.pathsep}{os.environ.get('PATH', '')}",
+            'FAKE_GH_LOG': str(self.log_path),
+            'FAKE_GH_PRS': json.dumps(self.PRS),
+        }
+        patcher = mock.patch.dict(os.environ, env)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def set_listed(self, numbers) -> None:
+        os.environ['FAKE_GH_LISTED'] = json.dumps(numbers)
+
+    def calls(self) -> list:
+        return self.log_path.read_text(encoding="utf-8").splitlines()
+
+    def test_bulk_list(self):
+        self.set_listed(['1', '2'])
+        prs_info = common_utils.get_prs_info("number,title,state")
+        self.assertEqual({n: pr['title'] for n, pr in prs_info.items()}, {1: "First", 2: "Second"})
+        self.assertEqual(len(self.calls()), 1)
+
+    def test_bulk_list_warns_at_the_limit(self):
+        self.set_listed(['4', '3', '2', '1'])
+        with self.assertLogs(common_utils.logger, 'WARNING') as logs:
+            prs_info = common_utils.get_prs_info(limit=2)
+        self.assertEqual(sorted(prs_info), [3, 4])
+        self.assertIn("the limit", logs.output[0])
+
+    def test_bulk_list_failure(self):
+        with self.assertLogs(common_utils.logger, 'WARNING'):
+            self.assertEqual(common_utils.get_prs_info(), {})
+
+    def test_per_pr_lookups(self):
+        results = common_utils.get_pr_info_many([3, 9, 1], "number,title")
+        self.assertEqual([r and r['title'] for r in results], ["Third", None, "First"])
+        self.assertEqual(len(self.calls()), 3)
+
+    def test_per_pr_lookup_timeout(self):
+        os.environ['FAKE_GH_DELAY'] = '5'
+        with self.assertLogs(common_utils.logger, 'ERROR') as logs:
+            results = common_utils.get_pr_info_many([1, 2], timeout=0.5)
+        self.assertEqual(results, [None, None])
+        self.assertIn("timed out", logs.output[0])
+
+    def test_cached_titles_fall_back_to_per_pr_lookups(self):
+        # Only PR 2 is in the bulk list: 1 and 3 are looked up one by one, 9 does not exist
+        self.set_listed(['2'])
+        cache_path = self.tmp_path / pr_cache.PR_CACHE_FILE
+        titles = pr_cache.get_cached_pr_titles([1, 2, 3, 9], cache_path, ttl=3600)
+        self.assertEqual(titles, {1: "First", 2: "Second", 3: "Third"})
+        self.assertEqual(sorted(call.split()[2] for call in self.calls() if call.startswith('pr view')),
+                         ['1', '3', '9'])
+
+        # Closed PRs are then served from the cache; only the unknown one is queried again
+        os.environ['FAKE_GH_LISTED'] = '[]'
+        self.log_path.write_text('', encoding="utf-8")
+        self.assertEqual(pr_cache.get_cached_pr_titles([1, 3, 9], cache_path, ttl=3600),
+                         {1: "First", 3: "Third"})
+        self.assertEqual([call.split()[:3] for call in self.calls()],
+                         [['pr', 'list', '--state'], ['pr', 'view', '9']])
+
+    def test_cached_titles_when_the_bulk_list_fails(self):
+        cache_path = self.tmp_path / pr_cache.PR_CACHE_FILE
+        self.assertEqual(pr_cache.get_cached_pr_titles([4], cache_path, ttl=3600), {4: "Fourth"})
+
+
+if __name__ == "__main__":
+    unittest.main()
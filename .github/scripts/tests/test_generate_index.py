@@ -0,0 +1,98 @@
+"""
+Incremental index updates must produce the same index.html as a full scan.
+"""
+import json
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import generate_index
+from pr_cache import PR_CACHE_FILE
+
+
+def make_deployment(base_path: Path, rel_path: str, languages=('it', 'en')) -> None:
+    for lang in languages:
+        lang_path = base_path / rel_path / lang
+        lang_path.mkdir(parents=True, exist_ok=True)
+        (lang_path / "index.html").write_text("<html></html>", encoding="utf-8")
+
+
+def render(structure, index_path: Path) -> bytes:
+    generate_index.write_html(structure, index_path)
+    return index_path.read_bytes()
+
+
+class IncrementalIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.base_path = Path(tmp.name) / "gh-pages"
+        self.out_path = Path(tmp.name) / "out"
+        self.out_path.mkdir()
+        make_deployment(self.base_path, "versione-corrente", ('it',))
+        make_deployment(self.base_path, "prs/pr1")
+        make_deployment(self.base_path, "prs/pr2", ('en',))
+        make_deployment(self.base_path, "releases/v1.0.0")
+
+    def save_state(self, structure) -> Path:
+        state_path = self.base_path / generate_index.INDEX_STATE_FILE
+        generate_index.save_index_state(state_path, structure)
+        return state_path
+
+    def change_tree(self) -> tuple:
+        """Deploy pr3 and v1.1.0, update pr2 and remove pr1 and v1.0.0."""
+        make_deployment(self.base_path, "prs/pr3")
+        make_deployment(self.base_path, "prs/pr2", ('it',))
+        make_deployment(self.base_path, "releases/v1.1.0", ('en',))
+        for rel_path in ("prs/pr1", "releases/v1.0.0"):
+            for lang_path in (self.base_path / rel_path).iterdir():
+                (lang_path / "index.html").unlink()
+                lang_path.rmdir()
+            (self.base_path / rel_path).rmdir()
+        return ["prs/pr3", "prs/pr2", "releases/v1.1.0"], ["prs/pr1", "releases/v1.0.0"]
+
+    def test_incremental_matches_full_scan(self):
+        self.save_state(generate_index.scan_directory(self.base_path, pr_titles={1: "One", 2: "Two"}))
+        added, removed = self.change_tree()
+
+        # Titles of untouched PRs changed too (e.g. a PR renamed on GitHub)
+        titles = {2: "Two, renamed", 3: "Three"}
+        saved = generate_index.load_index_state(self.base_path / generate_index.INDEX_STATE_FILE)
+        incremental = generate_index.update_structure(saved, self.base_path, added, removed, pr_titles=titles)
+        full = generate_index.scan_directory(self.base_path, pr_titles=titles)
+
+        self.assertEqual(incremental, full)
+        self.assertEqual(render(incremental, self.out_path / "incremental.html"),
+                         render(full, self.out_path / "full.html"))
+
+    def test_titles_from_the_pr_cache(self):
+        # Closed PRs never expire: both paths take the titles from the cache without querying GitHub
+        now = time.time()
+        cache = {str(n): {'title': f"PR {n} title", 'state': 'MERGED', 'fetched_at': now} for n in (1, 2, 3)}
+        (self.base_path / PR_CACHE_FILE).write_text(json.dumps(cache), encoding="utf-8")
+
+        self.save_state(generate_index.scan_directory(self.base_path))
+        added, removed = self.change_tree()
+        cache['2']['title'] = "Renamed"
+        (self.base_path / PR_CACHE_FILE).write_text(json.dumps(cache), encoding="utf-8")
+
+        saved = generate_index.load_index_state(self.base_path / generate_index.INDEX_STATE_FILE)
+        incremental = generate_index.update_structure(saved, self.base_path, added, removed)
+        full = generate_index.scan_directory(self.base_path)
+
+        self.assertEqual(incremental['prs']['pr2']['title'], "Renamed")
+        self.assertEqual(render(incremental, self.out_path / "incremental.html"),
+                         render(full, self.out_path / "full.html"))
+
+    def test_unknown_path_is_rejected(self):
+        with self.assertRaises(ValueError):
+            generate_index.update_structure(generate_index.scan_directory(self.base_path, pr_titles={}),
+                                            self.base_path, added=["somewhere/else"], pr_titles={})
+
+
+if __name__ == "__main__":
+    unittest.main()
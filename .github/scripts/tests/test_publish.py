@@ -0,0 +1,139 @@
+"""
+publish.py run twice into a gh-pages clone of a bare repository.
+"""
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+import publish
+
+
+def git(repo_dir: Path, *args: str) -> str:
+    return subprocess.run(["git", *args], cwd=repo_dir, check=True, stdout=subprocess.PIPE,
+                          stderr=subprocess.PIPE, text=True).stdout
+
+
+def write_files(root: Path, files: dict) -> None:
+    for rel_path, content in files.items():
+        path = root / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+
+
+def tree_files(root: Path) -> dict:
+    return {path.relative_to(root).as_posix(): path.read_text(encoding="utf-8")
+            for path in root.rglob("*") if path.is_file() and ".git" not in path.relative_to(root).parts}
+
+
+@unittest.skipIf(shutil.which("git") is None, "git is not installed")
+class PublishTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp_path = Path(tmp.name)
+        self.origin = self.tmp_path / "origin.git"
+        self.target = self.tmp_path / "gh-pages"
+        self.source = self.tmp_path / "html"
+
+        git(self.tmp_path, "init", "--bare", "-q", str(self.origin))
+        git(self.tmp_path, "clone", "-q", str(self.origin), str(self.target))
+        git(self.target, "config", "user.name", "Test")
+        git(self.target, "config", "user.email", "test@example.com")
+        git(self.target, "checkout", "-q", "-b", "gh-pages")
+        write_files(self.target, {"index.html": "index", "prs/pr2/it/index.html": "other preview"})
+        git(self.target, "add", "--all")
+        git(self.target, "commit", "-q", "-m", "Initial gh-pages")
+        git(self.target, "push", "-q", "origin", "gh-pages")
+
+    def build(self, files: dict) -> None:
+        shutil.rmtree(self.source, ignore_errors=True)
+        write_files(self.source, files)
+
+    def publish(self) -> None:
+        subprocess.run([sys.executable, str(SCRIPTS_DIR / "publish.py"), "--source", str(self.source),
+                        "--target", str(self.target), "prs/pr1", "--shared", "_assets"],
+                       check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def staged(self) -> list:
+        lines = git(self.target, "diff", "--cached", "--name-status", "-M").splitlines()
+        return sorted(tuple(line.split("\t")) for line in lines)
+
+    def commit_and_push(self, message: str) -> None:
+        git(self.target, "commit", "-q", "-m", message)
+        git(self.target, "push", "-q", "origin", "gh-pages")
+
+    def test_publish_twice(self):
+        manifest = f"prs/pr1/{publish.MANIFEST_NAME}"
+        self.build({
+            "prs/pr1/it/index.html": "v1",
+            "prs/pr1/it/obsolete.html": "removed later",
+            "prs/pr1/it/_static/theme.css": "body {}",
+            "prs/pr1/it/unchanged.html": "same",
+            "_assets/aa/aa11.css": "shared 1",
+        })
+        self.publish()
+        self.assertEqual(self.staged(), [
+            ("A", "_assets/aa/aa11.css"),
+            ("A", manifest),
+            ("A", "prs/pr1/it/_static/theme.css"),
+            ("A", "prs/pr1/it/index.html"),
+            ("A", "prs/pr1/it/obsolete.html"),
+            ("A", "prs/pr1/it/unchanged.html"),
+        ])
+        self.commit_and_push("Publish pr1")
+
+        # Second build: one page changed, one removed, one file renamed, a
+        # different shared asset (the old one must stay for other deployments)
+        self.build({
+            "prs/pr1/it/index.html": "v2",
+            "prs/pr1/it/_static/theme-v2.css": "body {}",
+            "prs/pr1/it/unchanged.html": "same",
+            "_assets/bb/bb22.css": "shared 2",
+        })
+        self.publish()
+        self.assertEqual(self.staged(), [
+            ("A", "_assets/bb/bb22.css"),
+            ("D", "prs/pr1/it/obsolete.html"),
+            ("M", manifest),
+            ("M", "prs/pr1/it/index.html"),
+            ("R100", "prs/pr1/it/_static/theme.css", "prs/pr1/it/_static/theme-v2.css"),
+        ])
+        # Nothing left unstaged or untracked
+        self.assertEqual(git(self.target, "diff", "--name-only"), "")
+        self.assertEqual(git(self.target, "ls-files", "--others"), "")
+        self.commit_and_push("Publish pr1 again")
+
+        clone = self.tmp_path / "clone"
+        git(self.tmp_path, "clone", "-q", "--branch", "gh-pages", str(self.origin), str(clone))
+        files = tree_files(clone)
+        self.assertEqual(sorted(files), [
+            "_assets/aa/aa11.css",
+            "_assets/bb/bb22.css",
+            "index.html",
+            manifest,
+            "prs/pr1/it/_static/theme-v2.css",
+            "prs/pr1/it/index.html",
+            "prs/pr1/it/unchanged.html",
+            "prs/pr2/it/index.html",
+        ])
+        self.assertEqual(files["prs/pr1/it/index.html"], "v2")
+        self.assertFalse((self.target / "prs/pr1/it/_static/theme.css").exists())
+
+    def test_publish_unchanged_build_stages_nothing(self):
+        files = {"prs/pr1/it/index.html": "v1", "_assets/aa/aa11.css": "shared 1"}
+        self.build(files)
+        self.publish()
+        self.commit_and_push("Publish pr1")
+        self.build(files)
+        self.publish()
+        self.assertEqual(self.staged(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+/*
+ * Search of the index page, over search-index.json written by
+ * scripts/generate_index.py (the merged Sphinx indexes of versione-corrente
+ * and of the releases, in both languages).
+ *
+ * Index terms are stemmed by the stemmer of each language, so a query word
+ * matches a term equal to it, starting with it, or that it starts with
+ * ("configuration" matches "configur", "config" matches "configur").
+ * Every word of the query must match; title matches rank first.
+ */
+(function () {
+  'use strict';
+
+  const MAX_RESULTS = 50;
+  const MIN_PREFIX = 3;
+
+  const container = document.getElementById('search');
+  const query = document.getElementById('search-query');
+  const version = document.getElementById('search-version');
+  const language = document.getElementById('search-language');
+  const status = document.getElementById('search-status');
+  const results = document.getElementById('search-results');
+  let loading = null;
+
+  function load() {
+    if (!loading) {
+      status.textContent = 'Loading the search index...';
+      loading = fetch(container.dataset.index)
+        .then((response) => {
+          if (!response.ok) throw new Error(response.statusText);
+          return response.json();
+        })
+        .then((index) => {
+          const versions = [...new Set(index.builds.map((build) => build.version))];
+          for (const name of versions) {
+            version.add(new Option(name, name));
+          }
+          status.textContent = '';
+          return index;
+        })
+        .catch((error) => {
+          status.textContent = 'The search index could not be loaded (' + error.message + ').';
+          loading = null;
+          throw error;
+        });
+    }
+    return loading;
+  }
+
+  function words(text) {
+    return text.toLowerCase().match(/[\p{L}\p{N}_]+/gu) || [];
+  }
+
+  function matches(term, word) {
+    if (term === word) return 2;
+    if ((word.length >= MIN_PREFIX && term.startsWith(word)) ||
+        (term.length >= MIN_PREFIX && word.startsWith(term))) return 1;
+    return 0;
+  }
+
+  // Score of each document for one word: {doc: score}
+  function scoreWord(index, word) {
+    const scores = new Map();
+    for (const [section, weight] of [['titleterms', 10], ['terms', 1]]) {
+      for (const [term, docs] of Object.entries(index[section])) {
+        const match = matches(term, word);
+        if (!match) continue;
+        for (const doc of docs) {
+          scores.set(doc, Math.max(scores.get(doc) || 0, weight * match));
+        }
+      }
+    }
+    return scores;
+  }
+
+  function search(index) {
+    const queryWords = [...new Set(words(query.value))];
+    results.textContent = '';
+    if (!queryWords.length) {
+      status.textContent = '';
+      return;
+    }
+
+    let total = null;
+    for (const word of queryWords) {
+      const scores = scoreWord(index, word);
+      if (total === null) {
+        total = scores;
+        continue;
+      }
+      for (const [doc, score] of total) {
+        if (scores.has(doc)) total.set(doc, score + scores.get(doc));
+        else total.delete(doc);
+      }
+    }
+
+    const found = [...total]
+      .filter(([doc]) => {
+        const build = index.builds[index.docs[doc][0]];
+        return (!version.value || build.version === version.value) &&
+               (!language.value || build.language === language.value);
+      })
+      .sort((a, b) => b[1] - a[1] || a[0] - b[0]);
+
+    status.textContent = found.length
+      ? found.length + ' result' + (found.length > 1 ? 's' : '') +
+        (found.length > MAX_RESULTS ? ', showing the first ' + MAX_RESULTS : '')
+      : 'No results';
+    for (const [doc] of found.slice(0, MAX_RESULTS)) {
+      const [buildNum, docname, title] = index.docs[doc];
+      const build = index.builds[buildNum];
+      const item = document.createElement('li');
+      const link = document.createElement('a');
+      link.className = 'pr-link';
+      link.href = build.path + '/' + build.language + '/' + docname + '.html';
+      link.textContent = title || docname;
+      item.appendChild(link);
+      for (const facet of [build.version, build.language]) {
+        const badge = document.createElement('span');
+        badge.className = 'search-facet';
+        badge.textContent = facet;
+        item.appendChild(badge);
+      }
+      results.appendChild(item);
+    }
+  }
+
+  let timer = null;
+  function schedule() {
+    clearTimeout(timer);
+    timer = setTimeout(() => load().then(search, () => {}), 150);
+  }
+
+  query.addEventListener('focus', () => load().catch(() => {}), { once: true });
+  query.addEventListener('input', schedule);
+  version.addEventListener('change', schedule);
+  language.addEventListener('change', schedule);
+})();
@@ -0,0 +1,148 @@
+"""
+build_profiler - Record where a Sphinx build spends its time.
+
+Records the wall time of the build phases (setup, read, the env-updated
+handlers such as PlantUML rendering, write, build-finished handlers such as
+Redoc), of every document read and written and of every PlantUML batch, using
+the tracer of .github/scripts/build_trace.py. The slowest
+``build_profiler_top`` spans are logged at the end of the build. If
+BUILD_TRACE_DIR is set, the spans are also saved there in Chrome trace
+format, with the traces of the other steps of the deployment.
+
+conf_base.py loads this extension only if BUILD_TRACE_DIR is set or
+BUILD_PROFILE=1. Without .github/scripts (e.g. docs copied elsewhere) it does
+nothing.
+
+Documents written by parallel write workers are timed as a whole by the write
+phase only.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+from sphinx.util import logging
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / ".github" / "scripts"))
+try:
+    from build_trace import Tracer, slowest  # noqa: E402
+except ImportError:
+    Tracer = None
+
+logger = logging.getLogger(__name__)
+
+
+def _mark(app, phase):
+    app.build_profiler_marks[phase] = (time.time(), time.perf_counter())
+
+
+def _add_phase(app, name, begin, end):
+    marks = app.build_profiler_marks
+    if begin in marks and end in marks:
+        start, started = marks[begin]
+        app.build_profiler.add(name, 'phase', start, marks[end][1] - started)
+
+
+def _on_builder_inited(app):
+    app.build_profiler.name = f'sphinx-{Path(app.srcdir).name}-{app.builder.name}'
+    _mark(app, 'builder-inited')
+    _add_phase(app, 'setup', 'setup', 'builder-inited')
+
+    write_doc = app.builder.write_doc
+
+    def timed_write_doc(docname, doctree):
+        with app.build_profiler.span(docname, 'write'):
+            write_doc(docname, doctree)
+
+    app.builder.write_doc = timed_write_doc
+
+
+def _on_env_before_read_docs(app, env, docnames):
+    _mark(app, 'read')
+    env.build_profiler_reads = {}
+
+
+def _on_source_read(app, docname, source):
+    app.build_profiler_reading[docname] = (time.time(), time.perf_counter())
+
+
+def _on_doctree_read(app, doctree):
+    docname = app.env.docname
+    if docname in app.build_profiler_reading:
+        start, started = app.build_profiler_reading.pop(docname)
+        if not hasattr(app.env, 'build_profiler_reads'):
+            app.env.build_profiler_reads = {}
+        app.env.build_profiler_reads[docname] = (start, time.perf_counter() - started)
+
+
+def _on_env_merge_info(app, env, docnames, other):
+    # Parallel read: bring back the timings of the worker processes
+    env.build_profiler_reads.update(getattr(other, 'build_profiler_reads', {}))
+
+
+def _on_env_updated(app, env):
+    _mark(app, 'env-updated')
+    _add_phase(app, 'read', 'read', 'env-updated')
+    for docname, (start, duration) in getattr(env, 'build_profiler_reads', {}).items():
+        app.build_profiler.add(docname, 'read', start, duration)
+
+
+def _on_write_started(app, builder):
+    _mark(app, 'write')
+    _add_phase(app, 'env-updated handlers', 'env-updated', 'write')
+
+
+def _on_build_finished_first(app, exception):
+    _mark(app, 'build-finished')
+    # Builders overriding write() (e.g. latex) do not emit write-started
+    begin = 'write' if 'write' in app.build_profiler_marks else 'env-updated'
+    _add_phase(app, 'write', begin, 'build-finished')
+
+
+def _on_build_finished_last(app, exception):
+    _mark(app, 'end')
+    _add_phase(app, 'build-finished handlers', 'build-finished', 'end')
+    _add_phase(app, 'total', 'setup', 'end')
+
+    tracer = app.build_profiler
+    top = app.config.build_profiler_top
+    if top:
+        logger.info(f'Slowest steps of {tracer.name} (top {top}):')
+        for event in slowest(tracer.events, top):
+            logger.info(f"  {event['dur'] / 1e6:9.3f}s  {event['cat']:<10} {event['name']}")
+    path = tracer.save()
+    if path:
+        logger.info(f'Build trace written to {path}')
+
+
+def setup(app):
+    app.add_config_value('build_profiler_top', 10, '')
+    if Tracer is None:
+        logger.warning('build_profiler: .github/scripts/build_trace.py not found, build not timed')
+        return {
+            'version': '0.1',
+            'parallel_read_safe': True,
+            'parallel_write_safe': True,
+        }
+
+    app.build_profiler = Tracer(f'sphinx-{Path(app.srcdir).name}')
+    app.build_profiler_marks = {}
+    app.build_profiler_reading = {}
+    _mark(app, 'setup')
+
+    app.connect('builder-inited', _on_builder_inited)
+    app.connect('env-before-read-docs', _on_env_before_read_docs)
+    app.connect('source-read', _on_source_read)
+    app.connect('doctree-read', _on_doctree_read, priority=900)
+    app.connect('env-merge-info', _on_env_merge_info)
+    # Before the other env-updated handlers (e.g. the PlantUML batch) ...
+    app.connect('env-updated', _on_env_updated, priority=100)
+    app.connect('write-started', _on_write_started)
+    # ... and around the other build-finished handlers
+    app.connect('build-finished', _on_build_finished_first, priority=100)
+    app.connect('build-finished', _on_build_finished_last, priority=900)
+    return {
+        'version': '0.1',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
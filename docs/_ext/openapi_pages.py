@@ -0,0 +1,358 @@
+"""
+openapi_pages - Static reference pages generated from OpenAPI 3 specs.
+
+The Redoc page renders the API client-side only. This extension parses each
+spec listed in ``openapi_pages`` once per build into a small index of
+operations and schemas (``$ref`` pointers are resolved once and memoized) and
+writes one reST document per operation and per schema, plus an index page,
+into the source tree before Sphinx reads it, like autosummary does. The pages
+are regular documents: they are searchable and end up in the LaTeX/PDF build
+when the index page is in a toctree.
+
+Configuration (conf.py)::
+
+    openapi_pages = {'api-reference': './oas3/API-test.yaml'}
+
+maps a directory of the source tree (owned by the extension, not to be edited)
+to the spec it is generated from. Files are only rewritten when their content
+changes, so incremental builds re-read just what changed in the spec.
+
+A ``$ref`` that cannot be resolved (remote, circular or dangling) is reported
+as a warning and shown as unresolved; it does not stop the build. Operations
+or schemas whose names map to the same page name get a numeric suffix.
+"""
+
+import json
+import os
+import re
+from functools import lru_cache
+
+import yaml
+from sphinx.util import logging
+from sphinx.util.osutil import ensuredir
+
+logger = logging.getLogger(__name__)
+
+_Loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+HTTP_METHODS = ('get', 'put', 'post', 'delete', 'options', 'head', 'patch', 'trace')
+
+_LABELS = {
+    'en': {
+        'operations': 'Operations', 'schemas': 'Schemas', 'parameters': 'Parameters',
+        'request_body': 'Request body', 'responses': 'Responses', 'properties': 'Properties',
+        'example': 'Example', 'name': 'Name', 'in': 'In', 'type': 'Type', 'required': 'Required',
+        'description': 'Description', 'status': 'Status', 'content': 'Content', 'tags': 'Tags',
+        'yes': 'yes', 'no': 'no', 'values': 'Allowed values', 'array_of': 'array of',
+        'unresolved': 'unresolved',
+    },
+    'it': {
+        'operations': 'Operazioni', 'schemas': 'Schemi', 'parameters': 'Parametri',
+        'request_body': 'Corpo della richiesta', 'responses': 'Risposte', 'properties': 'Proprietà',
+        'example': 'Esempio', 'name': 'Nome', 'in': 'In', 'type': 'Tipo', 'required': 'Obbligatorio',
+        'description': 'Descrizione', 'status': 'Stato', 'content': 'Contenuto', 'tags': 'Tag',
+        'yes': 'sì', 'no': 'no', 'values': 'Valori ammessi', 'array_of': 'array di',
+        'unresolved': 'non risolto',
+    },
+}
+
+_RST_SPECIAL = re.compile(r'([\\*`|_\[\]])')
+
+# Key of the placeholder standing for a $ref that cannot be resolved
+UNRESOLVED = 'x-unresolved-ref'
+
+
+class SpecIndex:
+    """Operations and schemas of an OpenAPI 3 spec, with memoized ``$ref`` resolution."""
+
+    def __init__(self, spec: dict):
+        self.spec = spec
+        self.info = spec.get('info', {})
+        self._resolved = {}
+        self.schemas = dict(spec.get('components', {}).get('schemas', {}))
+        self.operations = []
+        for path, path_item in spec.get('paths', {}).items():
+            path_item = self.resolve(path_item)
+            shared_parameters = path_item.get('parameters', [])
+            for method in HTTP_METHODS:
+                if method not in path_item:
+                    continue
+                operation = self.resolve(path_item[method])
+                parameters = {}
+                for p in map(self.resolve, shared_parameters + operation.get('parameters', [])):
+                    if 'name' in p and 'in' in p:
+                        parameters[(p['name'], p['in'])] = p
+                self.operations.append({
+                    'id': operation.get('operationId') or f'{method}-{path}',
+                    'method': method.upper(),
+                    'path': path,
+                    'operation': operation,
+                    'parameters': list(parameters.values()),
+                })
+
+        # Page names, unique even when different names have the same slug
+        for op, slug in zip(self.operations, _unique_slugs([op['id'] for op in self.operations], 'operation')):
+            op['slug'] = slug
+        self.schema_slugs = dict(zip(self.schemas, _unique_slugs(list(self.schemas), 'schema')))
+
+    def resolve(self, obj):
+        """Follow ``$ref`` (local JSON pointers) until a concrete object is reached.
+
+        A ``$ref`` that cannot be resolved is reported once and replaced by
+        ``{UNRESOLVED: ref}``.
+        """
+        seen = set()
+        while isinstance(obj, dict) and '$ref' in obj:
+            ref = obj['$ref']
+            if ref in seen:
+                logger.warning(f'openapi_pages: circular $ref {ref!r}', type='openapi')
+                for loop_ref in seen:
+                    self._resolved[loop_ref] = {UNRESOLVED: loop_ref}
+                return {UNRESOLVED: ref}
+            seen.add(ref)
+            if ref not in self._resolved:
+                try:
+                    self._resolved[ref] = self._lookup(ref)
+                except (ValueError, KeyError, IndexError, TypeError) as err:
+                    logger.warning(f'openapi_pages: cannot resolve $ref {ref!r}: {err}', type='openapi')
+                    self._resolved[ref] = {UNRESOLVED: ref}
+            obj = self._resolved[ref]
+        return obj
+
+    def _lookup(self, ref: str):
+        if not isinstance(ref, str) or not ref.startswith('#/'):
+            raise ValueError('only local $ref are supported')
+        node = self.spec
+        for part in ref[2:].split('/'):
+            part = part.replace('~1', '/').replace('~0', '~')
+            node = node[int(part)] if isinstance(node, list) else node[part]
+        if not isinstance(node, dict):
+            raise TypeError('it does not point to an object')
+        return node
+
+    def schema_name(self, obj):
+        """Name of the component schema a ``$ref`` points to, if any."""
+        ref = obj.get('$ref') if isinstance(obj, dict) else None
+        if isinstance(ref, str) and ref.startswith('#/components/schemas/'):
+            name = ref.rsplit('/', 1)[1].replace('~1', '/').replace('~0', '~')
+            if name in self.schemas:
+                return name
+        return None
+
+
+@lru_cache(maxsize=None)
+def _load_index(path: str, mtime: float) -> SpecIndex:
+    with open(path, encoding='utf-8') as f:
+        return SpecIndex(yaml.load(f, Loader=_Loader))
+
+
+def load_index(path: str) -> SpecIndex:
+    """Parse a spec once per process (and again only if the file changes)."""
+    return _load_index(os.path.abspath(path), os.stat(path).st_mtime)
+
+
+def _slug(text: str) -> str:
+    return re.sub(r'[^A-Za-z0-9]+', '-', text).strip('-').lower()
+
+
+def _unique_slugs(names: list, kind: str) -> list:
+    """Slugs of names, with a numeric suffix for the ones already taken."""
+    slugs = []
+    taken = {}
+    for name in names:
+        base = _slug(str(name)) or kind
+        slug = base
+        number = 1
+        while slug in taken:
+            number += 1
+            slug = f'{base}-{number}'
+        if slug != base:
+            logger.warning(f'openapi_pages: {kind} {name!r} has the same page name as {taken[base]!r},'
+                           f' written as {slug!r}', type='openapi')
+        taken[slug] = name
+        slugs.append(slug)
+    return slugs
+
+
+def _escape(text) -> str:
+    return _RST_SPECIAL.sub(r'\\\1', ' '.join(str(text).split()))
+
+
+def _title(text: str, underline: str) -> list:
+    text = _escape(text)
+    return [text, underline * len(text), '']
+
+
+def _schema_label(index: SpecIndex, name: str) -> str:
+    return f'openapi-schema-{index.schema_slugs[name]}'
+
+
+def _type_of(index: SpecIndex, schema, labels: dict) -> str:
+    """Short reST description of a schema: a link for named schemas, the type otherwise."""
+    name = index.schema_name(schema)
+    if name:
+        return f':ref:`{_escape(name)} <{_schema_label(index, name)}>`'
+    schema = index.resolve(schema) or {}
+    if UNRESOLVED in schema:
+        return f"{labels['unresolved']} {_escape(schema[UNRESOLVED])}"
+    if schema.get('type') == 'array':
+        return f"{labels['array_of']} {_type_of(index, schema.get('items', {}), labels)}"
+    text = schema.get('type', 'object')
+    if 'format' in schema:
+        text += f" ({schema['format']})"
+    return _escape(text)
+
+
+def _list_table(header: list, rows: list) -> list:
+    lines = ['.. list-table::', '   :header-rows: 1', '']
+    for row in [header] + rows:
+        lines.append(f'   * - {row[0]}')
+        lines.extend(f'     - {cell}'.rstrip() for cell in row[1:])
+    return lines + ['']
+
+
+def _render_operation(index: SpecIndex, op: dict, labels: dict) -> str:
+    operation = op['operation']
+    lines = [f".. _openapi-operation-{op['slug']}:", '']
+    lines += _title(f"{op['method']} {op['path']}", '=')
+    if operation.get('summary'):
+        lines += [f"**{_escape(operation['summary'])}**", '']
+    if operation.get('description'):
+        lines += [_escape(operation['description']), '']
+    if operation.get('tags'):
+        lines += [f"{labels['tags']}: {', '.join(_escape(t) for t in operation['tags'])}", '']
+
+    if op['parameters']:
+        lines += _title(labels['parameters'], '-')
+        rows = [[f"``{p['name']}``", p['in'], _type_of(index, p.get('schema', {}), labels),
+                 labels['yes'] if p.get('required') else labels['no'], _escape(p.get('description', ''))]
+                for p in op['parameters']]
+        lines += _list_table([labels['name'], labels['in'], labels['type'], labels['required'],
+                              labels['description']], rows)
+
+    if 'requestBody' in operation:
+        body = index.resolve(operation['requestBody'])
+        lines += _title(labels['request_body'], '-')
+        if body.get('description'):
+            lines += [_escape(body['description']), '']
+        rows = [[f'``{media}``', _type_of(index, content.get('schema', {}), labels)]
+                for media, content in body.get('content', {}).items()]
+        lines += _list_table([labels['content'], labels['type']], rows)
+
+    if operation.get('responses'):
+        lines += _title(labels['responses'], '-')
+        rows = []
+        for status, response in operation['responses'].items():
+            response = index.resolve(response)
+            types = ', '.join(_type_of(index, content.get('schema', {}), labels)
+                              for content in response.get('content', {}).values())
+            rows.append([f'``{status}``', _escape(response.get('description', '')), types])
+        lines += _list_table([labels['status'], labels['description'], labels['type']], rows)
+
+    return '\n'.join(lines)
+
+
+def _render_schema(index: SpecIndex, name: str, labels: dict) -> str:
+    schema = index.resolve(index.schemas[name])
+    lines = [f'.. _{_schema_label(index, name)}:', '']
+    lines += _title(name, '=')
+    if schema.get('description'):
+        lines += [_escape(schema['description']), '']
+
+    properties = schema.get('properties', {})
+    if properties:
+        required = set(schema.get('required', []))
+        rows = []
+        for prop, prop_schema in properties.items():
+            description = _escape(index.resolve(prop_schema).get('description', ''))
+            enum = index.resolve(prop_schema).get('enum')
+            if enum:
+                description += f" {labels['values']}: {', '.join(f'``{v}``' for v in enum)}"
+            rows.append([f'``{prop}``', _type_of(index, prop_schema, labels),
+                         labels['yes'] if prop in required else labels['no'], description.strip()])
+        lines += _title(labels['properties'], '-')
+        lines += _list_table([labels['name'], labels['type'], labels['required'], labels['description']], rows)
+
+    if 'example' in schema:
+        lines += _title(labels['example'], '-')
+        lines += ['.. code-block:: json', '']
+        lines += ['   ' + line for line in json.dumps(schema['example'], indent=2, ensure_ascii=False,
+                                                      default=str).splitlines()]
+        lines += ['']
+
+    return '\n'.join(lines)
+
+
+def _render_index(index: SpecIndex, operation_docs: list, schema_docs: list, labels: dict) -> str:
+    title = index.info.get('title', 'API')
+    if index.info.get('version'):
+        title += f" {index.info['version']}"
+    lines = _title(title, '=')
+    if index.info.get('description'):
+        lines += [_escape(index.info['description']), '']
+    for caption, docs in ((labels['operations'], operation_docs), (labels['schemas'], schema_docs)):
+        if docs:
+            lines += _title(caption, '-')
+            lines += ['.. toctree::', '   :maxdepth: 1', ''] + [f'   {doc}' for doc in docs] + ['']
+    return '\n'.join(lines)
+
+
+def _write_if_changed(path: str, content: str) -> bool:
+    try:
+        with open(path, encoding='utf-8') as f:
+            if f.read() == content:
+                return False
+    except FileNotFoundError:
+        pass
+    ensuredir(os.path.dirname(path))
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    return True
+
+
+def generate_pages(spec_path: str, target_dir: str, language: str) -> tuple:
+    """Write the reference pages of one spec into target_dir.
+
+    Returns:
+        (written, removed) file counts
+    """
+    index = load_index(spec_path)
+    labels = _LABELS.get((language or 'en').split('_')[0], _LABELS['en'])
+
+    pages = {}
+    for op in index.operations:
+        pages[f"operations/{op['slug']}"] = _render_operation(index, op, labels)
+    for name, slug in index.schema_slugs.items():
+        pages[f'schemas/{slug}'] = _render_schema(index, name, labels)
+    pages['index'] = _render_index(index, [d for d in pages if d.startswith('operations/')],
+                                   [d for d in pages if d.startswith('schemas/')], labels)
+
+    written = sum(_write_if_changed(os.path.join(target_dir, f'{doc}.rst'), content + '\n')
+                  for doc, content in pages.items())
+
+    # Pages of operations and schemas that are no longer in the spec
+    removed = 0
+    for root, _dirs, files in os.walk(target_dir):
+        for name in files:
+            doc = os.path.relpath(os.path.join(root, name), target_dir)[:-len('.rst')].replace(os.sep, '/')
+            if name.endswith('.rst') and doc not in pages:
+                os.remove(os.path.join(root, name))
+                removed += 1
+    return written, removed
+
+
+def _on_builder_inited(app):
+    for directory, spec in app.config.openapi_pages.items():
+        spec_path = os.path.join(app.confdir, spec)
+        written, removed = generate_pages(spec_path, os.path.join(app.srcdir, directory), app.config.language)
+        logger.info(f'openapi_pages: {spec} -> {directory}/ ({written} written, {removed} removed)')
+
+
+def setup(app):
+    app.add_config_value('openapi_pages', {}, 'env')
+    app.connect('builder-inited', _on_builder_inited)
+    return {
+        'version': '0.1',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
@@ -0,0 +1,380 @@
+"""
+plantuml_batch - Render all PlantUML diagrams of a build in one batch.
+
+sphinxcontrib.plantuml starts one JVM for every diagram it renders. This
+extension collects the diagram sources while documents are read and, once
+reading is done, renders every missing diagram with a single PlantUML run per
+output format. The results are written into the image cache the directive
+already looks at (``<outdir>/<plantuml_cache_path>``), so the directive only
+starts PlantUML itself for diagrams that failed to render, and reports their
+errors as usual. The layout of that cache is an internal detail of
+sphinxcontrib.plantuml, so it is checked before anything is placed there.
+
+The upstream ``plantuml_batch_size`` option is left at 1. It batches only the
+documents read in the current process, fails the whole batch on one syntax
+error, and writes into the per-language output directory, so nothing is shared
+between language trees or CI runs. It would also render again every diagram
+placed here, since it only skips keys with a ``.puml`` file next to the image.
+
+Rendered images are kept in a content-addressed store shared by every
+language tree (``plantuml_batch_cache_dir``), keyed by a hash of the diagram
+source, the PlantUML jar and the output format. The store is checked before
+anything is rendered, so a diagram identical in docs/it and docs/en (or
+unchanged since a previous CI run that persisted the directory) is rendered
+only once. The store is trimmed to ``plantuml_cache_max_size`` bytes, least
+recently used images first, and a hit/miss report is logged at the end of
+the build.
+
+If ``plantuml_server`` is set, diagrams are first requested from that
+PlantUML server; ``'auto'`` starts a local server from the jar in the
+``plantuml`` command (or reuses one another build started from the same jar),
+see plantuml_server.py. It is stopped when the process exits unless
+``plantuml_server_keep`` is set. Whatever the server cannot render falls back
+to the batch run.
+"""
+
+import copy
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache
+from types import SimpleNamespace
+
+from sphinx.errors import ExtensionError
+from sphinx.util import logging
+from sphinx.util.display import progress_message
+from sphinxcontrib.plantuml import _ARGS_BY_FILEFORMAT, _split_cmdargs, hash_plantuml_node, plantuml
+
+from plantuml_server import ensure_server, render_with_server
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Includes resolved relative to the document (not from the PlantUML stdlib)
+# depend on the working directory, so those diagrams are left to the directive
+_RELATIVE_INCLUDE = re.compile(r'^\s*!include\w*\s+(?!<)|%filename', re.MULTILINE)
+
+# A named @startuml makes PlantUML use that name for the output file
+_STARTUML_NAME = re.compile(rb'^(\s*@start\w+)[^\n]*', re.MULTILINE)
+
+
+def _is_batchable(uml: str) -> bool:
+    return not _RELATIVE_INCLUDE.search(uml)
+
+
+def _puml_source(uml: str) -> bytes:
+    """Source written to disk for a batch run, always producing ``<key>.<fmt>``."""
+    doc = uml.encode('utf-8')
+    if doc.lstrip().startswith(b'@start'):
+        return _STARTUML_NAME.sub(rb'\1', doc, count=1)
+    return b'@startuml\n' + doc + b'\n@enduml\n'
+
+
+@contextmanager
+def _locked(directory: str):
+    """Serialize batch runs of concurrent builds sharing the same store."""
+    os.makedirs(directory, exist_ok=True)
+    if fcntl is None:
+        yield
+        return
+    with open(os.path.join(directory, '.lock'), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _store_path(store_dir: str, key: str, fileformat: str) -> str:
+    return os.path.join(store_dir, key[:2], f'{key}.{fileformat}')
+
+
+@lru_cache(maxsize=None)
+def renderer_id(command: str) -> str:
+    """Identify the PlantUML renderer: its command and the content of its jar."""
+    digest = hashlib.sha256(command.encode('utf-8'))
+    args = _split_cmdargs(command)
+    if '-jar' in args[:-1]:
+        jar = args[args.index('-jar') + 1]
+        try:
+            with open(jar, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+        except OSError:
+            pass  # missing jar: the command (with the jar version in its name) is the id
+    return digest.hexdigest()
+
+
+def content_key(uml: str, renderer: str, fileformat: str) -> str:
+    """Key of a rendered image in the shared store."""
+    digest = hashlib.sha256(renderer.encode('utf-8'))
+    digest.update(b'\0' + fileformat.encode('utf-8') + b'\0')
+    digest.update(uml.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def evict(store_dir: str, max_size: int) -> int:
+    """Remove the least recently used images until the store fits in max_size bytes.
+
+    Returns:
+        Total size of the store after eviction
+    """
+    images = []
+    for root, _dirs, files in os.walk(store_dir):
+        for name in files:
+            if name.startswith('.') or name.endswith('.puml'):
+                continue
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            images.append((st.st_mtime, st.st_size, path))
+
+    total = sum(size for _mtime, size, _path in images)
+    for _mtime, size, path in sorted(images):
+        if total <= max_size:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except FileNotFoundError:
+            pass
+    return total
+
+
+def render_batch(command, sources: dict, fileformat: str, store_dir: str) -> set:
+    """Render diagrams with a single PlantUML invocation.
+
+    If PlantUML fails, the diagrams are rendered again one by one and only
+    those rendered without errors are stored; the others are left to the
+    directive, which renders them and reports the error.
+
+    Args:
+        command: The ``plantuml`` config value
+        sources: Diagram sources keyed by store key
+        fileformat: Output format (e.g. 'svg', 'eps')
+        store_dir: Directory receiving ``<key[:2]>/<key>.<fileformat>``
+
+    Returns:
+        Keys of the diagrams that were rendered
+    """
+    rendered = set()
+    with tempfile.TemporaryDirectory(dir=store_dir) as batch_dir:
+        for key, uml in sources.items():
+            with open(os.path.join(batch_dir, f'{key}.puml'), 'wb') as f:
+                f.write(_puml_source(uml))
+
+        args = _split_cmdargs(command) + ['-charset', 'utf-8'] + _ARGS_BY_FILEFORMAT[fileformat]
+        args += sorted(f'{key}.puml' for key in sources)
+        try:
+            result = subprocess.run(args, cwd=batch_dir, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except OSError as err:
+            logger.warning(f'plantuml command {command!r} cannot be run: {err}', type='plantuml')
+            return rendered
+        if result.returncode != 0:
+            # PlantUML writes error images too: keep nothing from a failed run
+            if len(sources) == 1:
+                # Not stored, so the directive renders this diagram and reports the error
+                logger.debug('plantuml failed on %s\n\n%s', next(iter(sources)),
+                             result.stderr.decode('utf-8', 'replace'))
+                return rendered
+            logger.info(f'plantuml batch failed, rendering {len(sources)} diagrams one by one')
+            for key, uml in sources.items():
+                rendered |= render_batch(command, {key: uml}, fileformat, store_dir)
+            return rendered
+
+        for key in sources:
+            produced = os.path.join(batch_dir, f'{key}.{fileformat}')
+            if os.path.exists(produced):
+                target = _store_path(store_dir, key, fileformat)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(produced, target)
+                rendered.add(key)
+    return rendered
+
+
+def check_cache_layout(plantuml_builder, fileformat: str) -> None:
+    """Make sure the directive finds images where they are placed.
+
+    Renders a probe diagram with the directive's builder, in an empty cache
+    holding only ``<key[:2]>/<key>.<fileformat>`` and with a PlantUML command
+    that cannot run: the directive must return that file without running
+    PlantUML.
+
+    Raises:
+        ExtensionError: if sphinxcontrib.plantuml looks for images elsewhere
+    """
+    node = plantuml('', uml='@startuml\n@enduml', incdir='', filename='plantuml_batch-probe')
+    key = hash_plantuml_node(node)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        expected = _store_path(cache_dir, key, fileformat)
+        os.makedirs(os.path.dirname(expected), exist_ok=True)
+        open(expected, 'wb').close()
+
+        probe = copy.copy(plantuml_builder)
+        probe.cache_dir = cache_dir
+        probe.builder = SimpleNamespace(srcdir=cache_dir, config=SimpleNamespace(
+            plantuml=[os.path.join(cache_dir, 'no-plantuml')], plantuml_syntax_error_image=False))
+        try:
+            found = probe.render(node, fileformat)
+        except Exception:  # PlantUmlError, or anything else from a changed implementation
+            found = None
+    if found != expected:
+        raise ExtensionError('plantuml_batch: sphinxcontrib.plantuml no longer looks for rendered images '
+                             'at <plantuml_cache_path>/<key[:2]>/<key>.<format>; '
+                             'update plantuml_batch.py or remove it from the extensions')
+
+
+def _get_sources(env) -> dict:
+    if not hasattr(env, 'plantuml_batch_sources'):
+        env.plantuml_batch_sources = {}
+    return env.plantuml_batch_sources
+
+
+def _on_doctree_read(app, doctree):
+    sources = {}
+    for node in doctree.findall(plantuml):
+        if _is_batchable(node['uml']):
+            sources[hash_plantuml_node(node)] = node['uml']
+    if sources:
+        _get_sources(app.env)[app.env.docname] = sources
+
+
+def _on_env_purge_doc(app, env, docname):
+    _get_sources(env).pop(docname, None)
+
+
+def _on_env_merge_info(app, env, docnames, other):
+    # Parallel read: bring back what the worker processes collected
+    sources = _get_sources(env)
+    for docname, doc_sources in _get_sources(other).items():
+        if docname in docnames:
+            sources[docname] = doc_sources
+
+
+# URL of the server started (or found) by this process, by port
+_servers = {}
+
+
+def get_server_url(config, store_dir: str) -> str:
+    """Resolve the ``plantuml_server`` setting to a server URL ('' if disabled)."""
+    setting = config.plantuml_server
+    if setting != 'auto':
+        return setting or ''
+
+    port = config.plantuml_server_port
+    if port not in _servers:
+        state_path = os.path.join(store_dir, f'.server-{port}.json')
+        _servers[port] = ensure_server(_split_cmdargs(config.plantuml), port, renderer_id(config.plantuml),
+                                       state_path, keep=config.plantuml_server_keep)
+    return _servers[port]
+
+
+def _span(app, name: str, **args):
+    """Time a step when build_profiler is loaded."""
+    tracer = getattr(app, 'build_profiler', None)
+    return tracer.span(name, 'diagram', **args) if tracer else nullcontext()
+
+
+def _get_store_dir(app) -> str:
+    return app.config.plantuml_batch_cache_dir or os.path.join(app.builder.plantuml_builder.cache_dir, 'store')
+
+
+def _on_env_updated(app, env):
+    plantuml_builder = getattr(app.builder, 'plantuml_builder', None)
+    if plantuml_builder is None or not plantuml_builder.image_formats:
+        return
+
+    sources = {}
+    for doc_sources in _get_sources(env).values():
+        sources.update(doc_sources)
+    if not sources:
+        return
+
+    stats = app.builder.plantuml_cache_stats = {'hits': 0, 'misses': 0}
+    store_dir = _get_store_dir(app)
+    renderer = renderer_id(app.config.plantuml)
+
+    def store_path(key, fmt):
+        return _store_path(store_dir, key, fmt)
+
+    for fileformat in plantuml_builder.image_formats:
+        check_cache_layout(plantuml_builder, fileformat)
+
+        # node hash (what the directive looks up) -> content key in the store
+        content_keys = {key: content_key(uml, renderer, fileformat) for key, uml in sources.items()}
+
+        with _locked(store_dir):
+            missing = {}
+            for key, uml in sources.items():
+                stored = store_path(content_keys[key], fileformat)
+                if os.path.exists(stored):
+                    stats['hits'] += 1
+                    os.utime(stored)  # most recently used
+                else:
+                    stats['misses'] += 1
+                    missing[content_keys[key]] = uml
+
+            server_url = get_server_url(app.config, store_dir) if missing else ''
+            if server_url:
+                with progress_message(f'rendering {len(missing)} plantuml diagrams ({fileformat}) on {server_url}'), \
+                        _span(app, f'plantuml server ({fileformat})', diagrams=len(missing)):
+                    rendered = render_with_server(server_url, missing, fileformat, store_path)
+                missing = {key: uml for key, uml in missing.items() if key not in rendered}
+            if missing:
+                with progress_message(f'rendering {len(missing)} plantuml diagrams ({fileformat}) in one batch'), \
+                        _span(app, f'plantuml batch ({fileformat})', diagrams=len(missing)):
+                    render_batch(app.config.plantuml, missing, fileformat, store_dir)
+
+            # Place the images where the directive looks for them
+            for key in sources:
+                stored = store_path(content_keys[key], fileformat)
+                target = _store_path(plantuml_builder.cache_dir, key, fileformat)
+                if os.path.exists(stored) and not os.path.exists(target):
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    shutil.copyfile(stored, target)
+
+
+def _on_build_finished(app, exception):
+    stats = getattr(app.builder, 'plantuml_cache_stats', None)
+    if stats is None:
+        return
+
+    store_dir = _get_store_dir(app)
+    with _locked(store_dir):
+        size = evict(store_dir, app.config.plantuml_cache_max_size)
+    lookups = stats['hits'] + stats['misses']
+    logger.info(f"plantuml cache: {stats['hits']} hits, {stats['misses']} misses"
+                f" ({stats['hits'] * 100 // max(1, lookups)}% hit rate),"
+                f" store {size / (1 << 20):.1f} MiB in {store_dir}")
+
+
+def setup(app):
+    app.setup_extension('sphinxcontrib.plantuml')
+    app.add_config_value('plantuml_batch_cache_dir', '', '')
+    app.add_config_value('plantuml_cache_max_size', 100 * 1024 * 1024, '')
+    app.add_config_value('plantuml_server_port', 8765, '')
+    app.add_config_value('plantuml_server_keep', False, '')
+    try:
+        app.add_config_value('plantuml_server', '', '')
+    except ExtensionError:
+        pass  # already provided by sphinxcontrib.plantuml
+    app.connect('doctree-read', _on_doctree_read)
+    app.connect('env-purge-doc', _on_env_purge_doc)
+    app.connect('env-merge-info', _on_env_merge_info)
+    app.connect('env-updated', _on_env_updated)
+    app.connect('build-finished', _on_build_finished)
+    return {
+        'version': '0.1',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
@@ -0,0 +1,257 @@
+"""
+plantuml_server - Render PlantUML diagrams through a long-lived local server.
+
+The bundled PlantUML jar can run as a small HTTP server (``-picoweb``). Once
+it is up, every diagram of every build (HTML and LaTeX, every language) is a
+plain HTTP request instead of a JVM start. The server is started on
+localhost on first use and stopped when the process exits, unless it is asked
+to keep running for the next builds.
+
+Its images go to a store keyed by the jar, so a server is only used if it was
+started from that jar: by this process, or by another build that recorded it
+in a state file next to the store. Any other server answering on the port
+(another PlantUML version, another program) is left alone. Nothing here needs
+network access beyond the loopback interface.
+"""
+
+import atexit
+import http.client
+import json
+import os
+import queue
+import signal
+import subprocess
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from sphinx.util import logging
+
+logger = logging.getLogger(__name__)
+
+# URL-safe alphabet of the PlantUML text encoding
+_ALPHABET = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz-_'
+
+# Output formats served by the PlantUML web server
+SERVER_FORMATS = ('svg', 'png', 'eps', 'txt')
+
+
+def encode(uml: str) -> str:
+    """Encode a diagram source for a PlantUML server URL (deflate + custom base64)."""
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -15)
+    data = compressor.compress(uml.encode('utf-8')) + compressor.flush()
+    encoded = []
+    for i in range(0, len(data), 3):
+        chunk = data[i:i + 3] + b'\0' * (3 - len(data[i:i + 3]))
+        b1, b2, b3 = chunk
+        for value in (b1 >> 2, ((b1 & 0x3) << 4) | (b2 >> 4), ((b2 & 0xF) << 2) | (b3 >> 6), b3 & 0x3F):
+            encoded.append(_ALPHABET[value])
+    return ''.join(encoded)
+
+
+class ConnectionPool:
+    """Keep-alive HTTP connections to one server, shared by worker threads."""
+
+    def __init__(self, url: str, timeout: float = 60):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def get(self, path: str) -> tuple:
+        """GET a path; returns (status, body). Retries once on a stale connection."""
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request('GET', self.prefix + path, headers={'Connection': 'keep-alive'})
+                response = conn.getresponse()
+                body = response.read()
+            except (http.client.HTTPException, OSError):
+                conn.close()
+                if attempt:
+                    raise
+                continue
+            if response.will_close:
+                conn.close()
+            else:
+                self._idle.put(conn)
+            return response.status, body
+
+    def close(self) -> None:
+        while not self._idle.empty():
+            self._idle.get_nowait().close()
+
+
+def is_alive(url: str, timeout: float = 2) -> bool:
+    """Check whether a PlantUML server answers at url."""
+    pool = ConnectionPool(url, timeout=timeout)
+    try:
+        status, _ = pool.get('/plantuml/txt/' + encode('@startuml\na -> b\n@enduml'))
+        return status == 200
+    except (http.client.HTTPException, OSError):
+        return False
+    finally:
+        pool.close()
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # exists, owned by someone else
+    return True
+
+
+def _read_state(state_path: str) -> dict:
+    try:
+        with open(state_path, encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return state if isinstance(state, dict) else {}
+
+
+def _write_state(state_path: str, state: dict) -> None:
+    os.makedirs(os.path.dirname(state_path), exist_ok=True)
+    tmp_path = f'{state_path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, state_path)
+
+
+def stop_server(process: subprocess.Popen, state_path: str, timeout: float = 10) -> None:
+    """Stop a server started by ensure_server() and forget its state."""
+    if _read_state(state_path).get('pid') == process.pid:
+        try:
+            os.remove(state_path)
+        except FileNotFoundError:
+            pass
+    if process.poll() is not None:
+        return
+    try:
+        if hasattr(os, 'killpg'):
+            os.killpg(process.pid, signal.SIGTERM)  # the JVM and anything it spawned
+        else:  # pragma: no cover - Windows
+            process.terminate()
+        process.wait(timeout)
+    except ProcessLookupError:
+        pass
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def ensure_server(command: list, port: int, renderer: str, state_path: str,
+                  keep: bool = False, startup_timeout: float = 60) -> str:
+    """Start a PlantUML server on localhost:port, or reuse one started from the same jar.
+
+    Args:
+        command: Command running the PlantUML jar (e.g. ['java', '-jar', 'plantuml.jar'])
+        port: Local port of the server
+        renderer: Id of the jar (see plantuml_batch.renderer_id), recorded in the state file
+        state_path: File recording the pid and renderer of the server started on port
+        keep: Leave the server running when this process exits, for the next builds
+        startup_timeout: Seconds to wait for a new server to answer
+
+    Returns:
+        Base URL of the server, or '' if none can be used
+    """
+    url = f'http://127.0.0.1:{port}'
+
+    def reusable() -> bool:
+        state = _read_state(state_path)
+        return state.get('renderer') == renderer and isinstance(state.get('pid'), int) and _pid_alive(state['pid'])
+
+    if is_alive(url):
+        if reusable():
+            logger.info(f'Using running PlantUML server at {url}')
+            return url
+        logger.warning(f'A PlantUML server not started from {command[-1]} answers at {url}; not using it',
+                       type='plantuml')
+        return ''
+
+    logger.info(f'Starting PlantUML server at {url}')
+    try:
+        process = subprocess.Popen(
+            command + [f'-picoweb:{port}:127.0.0.1'],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,  # not killed with the build by Ctrl-C, see stop_server()
+        )
+    except OSError as err:
+        logger.warning(f'PlantUML server cannot be started: {err}', type='plantuml')
+        return ''
+
+    deadline = time.monotonic() + startup_timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            # Port taken meanwhile, e.g. by a concurrent build started from the same jar
+            if is_alive(url) and reusable():
+                logger.info(f'Using PlantUML server at {url} started by another build')
+                return url
+            logger.warning(f'PlantUML server exited with status {process.returncode}', type='plantuml')
+            return ''
+        if is_alive(url):
+            _write_state(state_path, {'pid': process.pid, 'renderer': renderer})
+            if not keep:
+                atexit.register(stop_server, process, state_path)
+            return url
+        time.sleep(0.5)
+
+    stop_server(process, state_path)
+    logger.warning(f'PlantUML server did not answer at {url} within {startup_timeout}s', type='plantuml')
+    return ''
+
+
+def render_with_server(url: str, sources: dict, fileformat: str, store_path, workers: int = 4) -> set:
+    """Render diagrams through a PlantUML server.
+
+    Args:
+        url: Base URL of the server
+        sources: Diagram sources keyed by store key
+        fileformat: Output format (one of SERVER_FORMATS)
+        store_path: Function (key, fileformat) -> path receiving the image
+        workers: Concurrent requests (one pooled connection each)
+
+    Returns:
+        Keys of the diagrams that were rendered
+    """
+    if fileformat not in SERVER_FORMATS:
+        return set()
+
+    pool = ConnectionPool(url)
+
+    def render(item):
+        key, uml = item
+        try:
+            status, body = pool.get(f'/plantuml/{fileformat}/{encode(uml)}')
+        except (http.client.HTTPException, OSError) as err:
+            logger.warning(f'PlantUML server request failed: {err}', type='plantuml')
+            return None
+        if status != 200:
+            # Diagrams with errors are left to the directive, which reports them
+            return None
+        target = store_path(key, fileformat)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp_target = f'{target}.{os.getpid()}.tmp'
+        with open(tmp_target, 'wb') as f:
+            f.write(body)
+        os.replace(tmp_target, target)
+        return key
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return {key for key in executor.map(render, sources.items()) if key}
+    finally:
+        pool.close()
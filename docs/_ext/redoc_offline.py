@@ -0,0 +1,147 @@
+"""
+redoc_offline - Serve the Redoc API pages without any network access.
+
+sphinxcontrib.redoc downloads ``redoc_uri`` at the end of every build, and the
+generated page either fetches the YAML spec at load time or embeds it pretty
+printed. With ``redoc_offline = True`` this extension renders the pages
+configured in ``redoc`` itself:
+
+* the pinned Redoc bundle vendored in the repository (``redoc_offline_bundle``,
+  see utils/vendor_redoc.py) is copied to ``_static/redoc.js``; nothing is
+  downloaded, neither by the build nor by the browser;
+* every spec is converted once per process to minified JSON, written to
+  ``_specs/<name>.json`` and inlined in the page, so the browser never parses
+  YAML;
+* the bundle is preloaded, so its download starts with the page.
+
+The option is off by default (docs/conf_base.py turns it on with
+``REDOC_OFFLINE=1``). When on, the bundle is checked against the sha256
+committed next to it (``<bundle>.sha256``); if it is missing or does not
+match, the build stops with an error instead of falling back to a bundle from
+the network.
+"""
+
+import hashlib
+import json
+import os
+from functools import lru_cache
+
+import jinja2
+import yaml
+from sphinx.errors import ExtensionError
+from sphinx.util import logging
+from sphinx.util.osutil import copyfile, ensuredir
+
+logger = logging.getLogger(__name__)
+
+_TEMPLATE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'redoc_offline.j2')
+
+# libyaml is much faster on large specs when available
+_Loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+@lru_cache(maxsize=None)
+def _convert_spec(path: str, mtime: float) -> str:
+    with open(path, encoding='utf-8') as f:
+        try:
+            spec = yaml.load(f, Loader=_Loader)
+        except yaml.YAMLError as err:
+            raise ValueError(f'Cannot parse spec {path!r}: {err}') from err
+    return json.dumps(spec, ensure_ascii=False, separators=(',', ':'))
+
+
+def spec_to_json(path: str) -> str:
+    """Minified JSON of an OpenAPI spec (YAML or JSON), converted once per process."""
+    return _convert_spec(os.path.abspath(path), os.stat(path).st_mtime)
+
+
+@lru_cache(maxsize=None)
+def _get_template() -> jinja2.Template:
+    with open(_TEMPLATE, encoding='utf-8') as f:
+        return jinja2.Template(f.read())
+
+
+@lru_cache(maxsize=None)
+def _check_bundle(path: str, mtime: float) -> None:
+    checksum_file = path + '.sha256'
+    try:
+        with open(checksum_file, encoding='utf-8') as f:
+            expected = f.read().split()[0].lower()
+    except (OSError, IndexError):
+        raise ExtensionError(f'Checksum {checksum_file!r} of the Redoc bundle not found;'
+                             ' run utils/vendor_redoc.py and commit the bundle with its checksum')
+    with open(path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    if digest != expected:
+        raise ExtensionError(f'Redoc bundle {path!r} has sha256 {digest}, expected {expected};'
+                             ' run utils/vendor_redoc.py to restore the pinned bundle')
+
+
+def check_bundle(path: str) -> None:
+    """Check the vendored bundle against its committed sha256, once per process.
+
+    Raises:
+        ExtensionError: If the bundle or its checksum is missing, or they do not match
+    """
+    if not os.path.isfile(path):
+        raise ExtensionError(f'Redoc bundle {path!r} not found; run utils/vendor_redoc.py'
+                             ' and commit the bundle with its checksum')
+    _check_bundle(os.path.abspath(path), os.stat(path).st_mtime)
+
+
+def _on_config_inited(app, config):
+    if not config.redoc_offline or not config.redoc:
+        return
+    check_bundle(config.redoc_offline_bundle)
+
+    # Take the pages over from sphinxcontrib.redoc, and keep it from downloading
+    app.redoc_offline_pages = [dict(ctx) for ctx in config.redoc]
+    config.redoc = []
+    config.redoc_uri = None
+
+
+def _on_html_collect_pages(app):
+    pages = getattr(app, 'redoc_offline_pages', [])
+    if not pages or app.builder.format != 'html':
+        return
+
+    specs_dir = os.path.join(app.builder.outdir, '_specs')
+    ensuredir(specs_dir)
+    for page in pages:
+        if page['spec'].startswith(('http://', 'https://')):
+            raise ValueError(f"redoc_offline cannot embed remote spec {page['spec']!r}")
+
+        spec_json = spec_to_json(os.path.join(app.confdir, page['spec']))
+        spec_name = os.path.splitext(os.path.basename(page['spec']))[0] + '.json'
+        with open(os.path.join(specs_dir, spec_name), 'w', encoding='utf-8') as f:
+            f.write(spec_json)
+
+        ctx = dict(page)
+        ctx['opts'] = page.get('opts', {})
+        # Inlined in a <script> element: '</' must not close it
+        ctx['spec'] = spec_json.replace('</', '<\\/')
+        ctx['spec_url'] = f'_specs/{spec_name}'
+        yield page['page'], ctx, _get_template()
+
+
+def _on_build_finished(app, exception):
+    if exception or not getattr(app, 'redoc_offline_pages', None) or app.builder.format != 'html':
+        return
+    static_dir = os.path.join(app.builder.outdir, '_static')
+    ensuredir(static_dir)
+    copyfile(app.config.redoc_offline_bundle, os.path.join(static_dir, 'redoc.js'))
+
+
+def setup(app):
+    app.setup_extension('sphinxcontrib.redoc')
+    app.add_config_value('redoc_offline', False, 'html')
+    app.add_config_value('redoc_offline_bundle', '', 'html')
+    app.connect('config-inited', _on_config_inited)
+    app.connect('html-collect-pages', _on_html_collect_pages)
+    # After sphinxcontrib.redoc has copied its own (outdated) bundle
+    app.connect('build-finished', _on_build_finished, priority=600)
+    return {
+        'version': '0.1',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
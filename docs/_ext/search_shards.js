@@ -0,0 +1,103 @@
+/*
+ * search_shards.js - load the Sphinx search index lazily, in shards.
+ *
+ * Written next to searchtools.js by the search_shards extension. Loads the
+ * manifest and the base of the index (everything but the terms), then wraps
+ * Search.query so that each query first fetches the shards of its stemmed
+ * words (same Stemmer as searchtools.js, from language_data.js). Base and
+ * shards have content-addressed names: they are kept in the Cache Storage
+ * and never fetched twice. Without fetch (file://), the whole searchindex.js
+ * is loaded as usual.
+ */
+(() => {
+  "use strict";
+
+  const CACHE_NAME = "sphinx-search-shards";
+  const script = document.currentScript;
+  const manifestUrl = new URL(script.dataset.manifest, window.location.href);
+  const loaded = new Map(); // shard URL -> Promise
+
+  const openCache = () =>
+    window.caches ? caches.open(CACHE_NAME).catch(() => null) : Promise.resolve(null);
+
+  // Immutable files: from the Cache Storage if there, else fetched and stored
+  const fetchImmutable = async (url) => {
+    const cache = await openCache();
+    let response = cache ? await cache.match(url) : undefined;
+    if (!response) {
+      response = await fetch(url);
+      if (!response.ok) throw new Error(`${url}: ${response.status}`);
+      if (cache) await cache.put(url, response.clone()).catch(() => {});
+    }
+    return response.json();
+  };
+
+  // Entries of the previous builds of this index
+  const pruneCache = async (manifest) => {
+    const cache = await openCache();
+    if (!cache) return;
+    const base = new URL(".", manifestUrl).href;
+    const current = new Set(
+      [manifest.base, ...Object.values(manifest.shards)].map((name) => new URL(name, manifestUrl).href)
+    );
+    for (const request of await cache.keys()) {
+      if (request.url.startsWith(base) && !current.has(request.url)) cache.delete(request);
+    }
+  };
+
+  // Shard of a term: the one of its longest prefix that has a shard
+  const shardOf = (manifest, term) => {
+    const chars = [...term];
+    for (let length = chars.length; length >= 0; length--) {
+      const prefix = chars.slice(0, length).join("");
+      if (manifest.shards.hasOwnProperty(prefix)) return manifest.shards[prefix];
+    }
+    return null;
+  };
+
+  const loadShard = (index, name) => {
+    const url = new URL(name, manifestUrl).href;
+    if (!loaded.has(url)) {
+      loaded.set(url, fetchImmutable(url).then((shard) => {
+        Object.assign(index.terms, shard.terms);
+        Object.assign(index.titleterms, shard.titleterms);
+      }));
+    }
+    return loaded.get(url);
+  };
+
+  const init = async () => {
+    const response = await fetch(manifestUrl, { cache: "no-cache" });
+    if (!response.ok) throw new Error(`${manifestUrl}: ${response.status}`);
+    const manifest = await response.json();
+    const index = Object.assign(await fetchImmutable(new URL(manifest.base, manifestUrl).href), {
+      terms: {},
+      titleterms: {},
+    });
+
+    const query = Search.query;
+    Search.query = (text) => {
+      const [, searchTerms, excludedTerms] = Search._parseQuery(text);
+      const shards = new Set(
+        [...searchTerms, ...excludedTerms].map((term) => shardOf(manifest, term)).filter(Boolean)
+      );
+      Promise.all([...shards].map((name) => loadShard(index, name)))
+        .then(() => query(text))
+        .catch((error) => {
+          console.error("search_shards:", error);
+          query(text);
+        });
+    };
+    Search.setIndex(index);
+    pruneCache(manifest).catch(() => {});
+  };
+
+  if (!window.fetch || typeof Search._parseQuery !== "function") {
+    Search.loadIndex(script.dataset.index);
+    return;
+  }
+  init().catch((error) => {
+    console.warn("search_shards: loading the whole index,", error);
+    Search.loadIndex(script.dataset.index);
+  });
+})();
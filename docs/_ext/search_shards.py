@@ -0,0 +1,186 @@
+"""
+search_shards - Load the search index of an HTML build lazily, in shards.
+
+Sphinx writes one ``searchindex.js`` per build, which the search page
+downloads and parses in full before the first query runs. After every HTML
+build this extension splits it into ``_searchindex/``:
+
+* a base file with everything but the terms (document names and titles,
+  section titles, objects, index entries);
+* shards of the ``terms`` and ``titleterms`` tables, by term prefix. A prefix
+  whose terms exceed ``search_shards_max_size`` bytes is split again on the
+  next character, so shard sizes stay bounded whatever the vocabulary;
+* a small ``manifest.json`` naming the base and the shard of each prefix.
+
+Base and shards are named after their content, so browsers can keep them
+forever. The search page loads ``_static/search_shards.js`` instead of
+``searchindex.js``: it stems the query with the Stemmer of the build language
+(Italian and English Snowball/Porter stemmers, from ``language_data.js``, the
+same algorithms Sphinx used to build the terms), fetches only the shards of
+those stems, keeps them in the Cache Storage and then runs the stock Sphinx
+search. Partial matches are looked for among the terms of the loaded shards,
+i.e. terms sharing the prefix of a query word.
+
+``searchindex.js`` is left untouched: Sphinx reads it back in incremental
+builds, and the page falls back to it where ``fetch`` is not available (pages
+opened from ``file://``).
+"""
+
+import hashlib
+import json
+import os
+import re
+
+from sphinx.util import logging
+from sphinx.util.osutil import copyfile, ensuredir
+
+logger = logging.getLogger(__name__)
+
+_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'search_shards.js')
+
+SHARDS_DIR = '_searchindex'
+MANIFEST = 'manifest.json'
+
+# Tables of searchindex.js split by term
+_TERM_TABLES = ('terms', 'titleterms')
+
+# Script tag of the search page loading the whole index
+_INDEX_SCRIPT_RE = re.compile(r'<script src="(?P<prefix>[^"]*?)searchindex\.js"[^>]*></script>')
+
+_INDEX_PREFIX = 'Search.setIndex('
+
+
+def _dumps(obj) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+
+
+def read_search_index(path: str) -> dict:
+    """Data of a Sphinx ``searchindex.js``."""
+    with open(path, encoding='utf-8') as f:
+        text = f.read().strip()
+    if not text.startswith(_INDEX_PREFIX):
+        raise ValueError(f'{path} is not a Sphinx search index')
+    return json.loads(text[len(_INDEX_PREFIX):].rstrip(';').rstrip(')'))
+
+
+def split_prefixes(sizes: dict, max_size: int, prefix: str = '') -> dict:
+    """Assign every term to the shard of its longest prefix.
+
+    Args:
+        sizes: Serialized size of the entries of each term (all starting with prefix)
+        max_size: Size above which a shard is split on the next character
+        prefix: Prefix shared by the terms
+
+    Returns:
+        Terms by shard prefix; a term is always in the shard of the longest
+        prefix of it that has a shard
+    """
+    if sum(sizes.values()) <= max_size:
+        return {prefix: sorted(sizes)}
+    depth = len(prefix)
+    shards = {}
+    exact = [term for term in sizes if len(term) == depth]
+    if exact:
+        shards[prefix] = exact
+    groups = {}
+    for term, size in sizes.items():
+        if len(term) > depth:
+            groups.setdefault(term[depth], {})[term] = size
+    for char, group in sorted(groups.items()):
+        shards.update(split_prefixes(group, max_size, prefix + char))
+    return shards
+
+
+def _write_content_addressed(directory: str, content: str) -> str:
+    data = content.encode('utf-8')
+    name = hashlib.sha256(data).hexdigest()[:16] + '.json'
+    path = os.path.join(directory, name)
+    if not os.path.exists(path):
+        with open(path, 'wb') as f:
+            f.write(data)
+    return name
+
+
+def write_shards(index: dict, outdir: str, max_size: int) -> dict:
+    """Write the base, the shards and the manifest of a search index.
+
+    Returns:
+        The manifest
+    """
+    shards_dir = os.path.join(outdir, SHARDS_DIR)
+    ensuredir(shards_dir)
+
+    tables = {table: index.get(table, {}) for table in _TERM_TABLES}
+    sizes = {}
+    for table in tables.values():
+        for term, docs in table.items():
+            sizes[term] = sizes.get(term, 0) + len(term) + len(_dumps(docs)) + 4
+
+    base = {key: value for key, value in index.items() if key not in _TERM_TABLES}
+    manifest = {
+        'version': 1,
+        'base': _write_content_addressed(shards_dir, _dumps(base)),
+        'shards': {},
+    }
+    for prefix, terms in split_prefixes(sizes, max_size).items():
+        shard = {table: {term: tables[table][term] for term in terms if term in tables[table]}
+                 for table in _TERM_TABLES}
+        manifest['shards'][prefix] = _write_content_addressed(shards_dir, _dumps(shard))
+
+    with open(os.path.join(shards_dir, MANIFEST), 'w', encoding='utf-8') as f:
+        f.write(_dumps(manifest))
+
+    # Shards of previous builds
+    used = {manifest['base'], MANIFEST, *manifest['shards'].values()}
+    for name in os.listdir(shards_dir):
+        if name not in used:
+            os.remove(os.path.join(shards_dir, name))
+    return manifest
+
+
+def _patch_search_page(path: str) -> bool:
+    with open(path, encoding='utf-8') as f:
+        html = f.read()
+    if 'search_shards.js' in html:
+        return True  # page not rewritten since the last build
+
+    def replace(match):
+        prefix = match.group('prefix')
+        return (f'<script src="{prefix}_static/search_shards.js" '
+                f'data-manifest="{prefix}{SHARDS_DIR}/{MANIFEST}" '
+                f'data-index="{prefix}searchindex.js" defer="defer"></script>')
+
+    patched, count = _INDEX_SCRIPT_RE.subn(replace, html, count=1)
+    if count:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(patched)
+    return bool(count)
+
+
+def _on_build_finished(app, exception):
+    builder = app.builder
+    if exception or not app.config.search_shards or builder.format != 'html' or not getattr(builder, 'search', False):
+        return
+    index_path = os.path.join(builder.outdir, builder.searchindex_filename)
+    search_page = os.path.join(builder.outdir, builder.get_outfilename('search'))
+    if not os.path.isfile(index_path) or not os.path.isfile(search_page):
+        return
+
+    manifest = write_shards(read_search_index(index_path), builder.outdir, app.config.search_shards_max_size)
+    copyfile(_SCRIPT, os.path.join(builder.outdir, '_static', 'search_shards.js'))
+    if not _patch_search_page(search_page):
+        logger.warning('search_shards: searchindex.js script not found in the search page, '
+                       'it keeps loading the whole index')
+        return
+    logger.info(f"search_shards: index split into {len(manifest['shards'])} shards in {SHARDS_DIR}/")
+
+
+def setup(app):
+    app.add_config_value('search_shards', True, 'html')
+    app.add_config_value('search_shards_max_size', 32 * 1024, 'html')
+    app.connect('build-finished', _on_build_finished)
+    return {
+        'version': '0.1',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sphinx configuration shared by every language tree.
+
+Each docs/<lang>/conf.py only holds its PROJECT variables and the strings that
+differ between languages, and gets the rest from language_config(). The module
+is imported once per process, so when several languages are built in the same
+process (utils/build_docs.py) the shared setup below is done only once.
+Nothing here prints or touches the disk at import time.
+"""
+
+import os
+from functools import lru_cache
+from pathlib import Path
+
+DOCS_DIR = Path(__file__).resolve().parent
+REPO_DIR = DOCS_DIR.parent
+
+# PlantUML jar used when none is found in utils/plantuml
+PLANTUML_JAR = REPO_DIR / "utils/plantuml/plantuml-1.2025.2.jar"
+
+# Pinned Redoc version: CDN bundle, or the one vendored by utils/vendor_redoc.py
+# (with its .sha256) for offline builds
+REDOC_VERSION = "2.1.5"
+REDOC_BUNDLE = DOCS_DIR / "_static" / "redoc" / f"redoc-{REDOC_VERSION}.standalone.js"
+
+#------------------------------------------------------------------
+# PlantUML jar: $PLANTUML_JAR, else the newest jar in utils/plantuml
+#------------------------------------------------------------------
+@lru_cache(maxsize=None)
+def find_plantuml_jar() -> Path:
+    if os.environ.get('PLANTUML_JAR'):
+        return Path(os.environ['PLANTUML_JAR']).resolve()
+
+    def version_key(jar):
+        return [int(part) if part.isdigit() else 0 for part in jar.stem.split('-')[-1].split('.')]
+
+    jars = sorted(PLANTUML_JAR.parent.glob('plantuml-*.jar'), key=version_key)
+    return jars[-1] if jars else PLANTUML_JAR
+
+#-----------------------------------------------------------------------
+# Settings of one language; mutable values are fresh for every call, as
+# Sphinx and some extensions modify them in place during a build
+#-----------------------------------------------------------------------
+def language_config(language, project_name, editor_name, doc_version, basename, file_name,
+                    texinfo_category='Miscellaneous', redoc_name=None) -> dict:
+    config = {
+        'version': doc_version,
+        'language': language,
+        'project': project_name,
+
+        # -- RTD configuration ------------------------------------------------
+        # on_rtd is whether we are on readthedocs.org
+        'on_rtd': os.environ.get('READTHEDOCS', None) == 'True',
+        'rtd_version': os.environ.get('READTHEDOCS_VERSION', 'latest'),
+        'rtd_project': os.environ.get('READTHEDOCS_PROJECT', ''),
+
+        # -- General configuration --------------------------------------------
+        'needs_sphinx': '7.0',
+        'extensions': [
+            'sphinx.ext.autodoc',
+            'sphinx.ext.doctest',
+            'sphinx.ext.intersphinx',
+            'sphinx.ext.todo',
+            'sphinx.ext.coverage',
+            'sphinx.ext.ifconfig',
+            'sphinx.ext.autosectionlabel',
+            'sphinxcontrib.redoc',
+            'myst_parser',
+            'sphinxcontrib.plantuml',
+            'plantuml_batch',
+            'openapi_pages',
+            'search_shards',
+        ],
+
+        # The jar is only reported once a build starts, see setup()
+        'plantuml': f'java -jar {find_plantuml_jar()}',
+        'plantuml_output_format': 'svg',
+        'plantuml_latex_output_format': 'pdf',
+        'plantuml_batch_cache_dir': str(REPO_DIR / "build" / "plantuml"),
+        # Set PLANTUML_SERVER=auto to render through a local PlantUML server started
+        # from the jar above, or to a server URL. With PLANTUML_SERVER_KEEP=1 the
+        # local server keeps running after the build, for the next ones.
+        'plantuml_server': os.environ.get('PLANTUML_SERVER', ''),
+        'plantuml_server_keep': os.environ.get('PLANTUML_SERVER_KEEP') == '1',
+
+        # Static, searchable reference pages (also in the PDF) generated from the
+        # OpenAPI spec into api-reference/ at every build; do not edit them
+        'openapi_pages': {'api-reference': './oas3/API-test.yaml'},
+
+        # The search page loads the index in term-prefix shards of at most
+        # this many bytes, fetched only when a query needs them
+        'search_shards_max_size': 32 * 1024,
+
+        'images_config': {
+            "default_image_width": "99%",
+            "align": "center"
+        },
+
+        'templates_path': ['_templates'],
+        'source_suffix': ['.rst', '.md'],
+        'source_encoding': 'utf-8',
+        'master_doc': 'index',
+        'exclude_patterns': ['.DS_Store', 'README', 'README.md', '.venv*', '.env*'],
+        'pygments_style': 'sphinx',
+
+        # -- myst-parser setup ------------------------------------------------
+        'myst_enable_extensions': [
+            "colon_fence",
+            "smartquotes",
+            "replacements",
+            "deflist",
+        ],
+        # Similar to recommonmark's AutoStructify
+        'myst_heading_anchors': 3,
+        'myst_enable_auto_toc_tree': True,
+        'myst_update_mathjax': False,
+
+        # -- Options for HTML output ------------------------------------------
+        'html_theme': 'piccolo_theme',
+        'html_theme_options': {
+            "show_theme_credit": False,
+            "source_url": 'https://github.com/fmarino-ipzs/test-doc-rst/',
+            "source_icon": "github",
+        },
+        'html_title': f"{project_name} - {doc_version}",
+        'html_last_updated_fmt': '%d/%m/%Y',
+        'html_show_copyright': False,
+        'htmlhelp_basename': basename + 'doc',
+
+        # -- Options for LaTeX output -----------------------------------------
+        'latex_elements': {
+            'papersize': 'a4paper',
+            'pointsize': '10pt',
+            'sphinxsetup': 'verbatimforcewraps=true',
+        },
+        # (source start file, target name, title, author, documentclass)
+        'latex_documents': [
+            ('index', file_name + '.tex', project_name, editor_name, 'manual'),
+        ],
+        'latex_use_parts': True,
+        'latex_show_pagerefs': True,
+        'latex_show_urls': "inline",
+
+        # -- Options for manual page output -----------------------------------
+        # (source start file, name, description, authors, manual section)
+        'man_pages': [
+            ('index', file_name, project_name, [editor_name], 1),
+        ],
+
+        # -- Options for Texinfo output ---------------------------------------
+        # (source start file, target name, title, author, dir menu entry,
+        # description, category)
+        'texinfo_documents': [
+            ('index', file_name, project_name, project_name, project_name, texinfo_category),
+        ],
+
+        'numfig': True,
+        # to turn smartquotes off and be able to use
+        'smartquotes': False,
+        'autosectionlabel_prefix_document': True,
+    }
+
+    if config['rtd_version'] not in ['stable', 'latest']:
+        config['rtd_version'] = 'latest'
+
+    # Build timings, only when traced (CI) or asked for with BUILD_PROFILE=1.
+    # First, to time the loading of the other extensions too
+    if os.environ.get('BUILD_TRACE_DIR') or os.environ.get('BUILD_PROFILE') == '1':
+        config['extensions'].insert(0, 'build_profiler')
+
+    if redoc_name:
+        config['extensions'].append('redoc_offline')
+        config['redoc'] = [
+            {
+                'name': redoc_name,
+                'page': 'API-test',
+                'spec': './oas3/API-test.yaml',
+                'embed': True,
+            }
+        ]
+        config['redoc_uri'] = f'https://cdn.redoc.ly/redoc/v{REDOC_VERSION}/bundles/redoc.standalone.js'
+        # Set REDOC_OFFLINE=1 to serve the API page from the pinned bundle vendored by
+        # utils/vendor_redoc.py, with the spec pre-converted to JSON and inlined (no
+        # network at build or view time); the bundle and its .sha256 must be present
+        config['redoc_offline'] = os.environ.get('REDOC_OFFLINE') == '1'
+        config['redoc_offline_bundle'] = str(REDOC_BUNDLE)
+
+    return config
+
+#-------------------------------------------------------
+# Report the PlantUML jar once a build actually uses it
+#-------------------------------------------------------
+def _log_plantuml_jar(app):
+    jar = find_plantuml_jar()
+    if str(jar) not in app.config.plantuml:
+        return  # another command was configured (e.g. with -D plantuml=...)
+
+    from sphinx.util import logging
+    logger = logging.getLogger(__name__)
+    logger.info(f"plantuml_jar path = {jar}")
+    if not jar.is_file():
+        logger.warning(f"PlantUML jar {jar} not found", type='plantuml')
+
+def setup(app):
+    app.connect('builder-inited', _log_plantuml_jar)
+    return {
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
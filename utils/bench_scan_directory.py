@@ -0,0 +1,90 @@
+"""
+bench_scan_directory.py - Benchmark of generate_index.scan_directory.
+
+Builds a synthetic gh-pages tree (about 1,000 PR previews by default) and
+compares the os.scandir based scanner with the previous pathlib based one.
+The two are run alternately, so that the load of the machine weighs on both
+alike, and the minimum and median times are reported.
+"""
+
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / ".github" / "scripts"))
+from generate_index import scan_directory
+
+#---------------------------------------------
+# Build a synthetic gh-pages tree for the test
+#---------------------------------------------
+def build_tree(base_path: Path, num_prs: int = 1000, num_releases: int = 50, files_per_lang: int = 20) -> None:
+    deployments = [base_path / "versione-corrente"]
+    deployments += [base_path / "prs" / f"pr{n}" for n in range(1, num_prs + 1)]
+    deployments += [base_path / "releases" / f"v1.{n}.0" for n in range(num_releases)]
+
+    for deployment in deployments:
+        for lang in ('it', 'en'):
+            lang_path = deployment / lang
+            (lang_path / "_static").mkdir(parents=True)
+            (lang_path / "index.html").touch()
+            for i in range(files_per_lang):
+                (lang_path / f"page{i}.html").touch()
+
+#--------------------------------------------------
+# Previous implementation (pathlib, one stat per probe)
+#--------------------------------------------------
+def legacy_scan(base_path: Path) -> dict:
+    structure = {'versione-corrente': {'exists': False, 'languages': {'it': False, 'en': False}},
+                 'prs': {}, 'releases': {}}
+
+    versione_corrente_path = base_path / "versione-corrente"
+    if versione_corrente_path.exists():
+        structure['versione-corrente']['exists'] = True
+        for lang in ['it', 'en']:
+            structure['versione-corrente']['languages'][lang] = (versione_corrente_path / lang / "index.html").exists()
+
+    for section in ('prs', 'releases'):
+        section_path = base_path / section
+        if not section_path.exists():
+            continue
+        for d in [d for d in section_path.iterdir() if d.is_dir()]:
+            if section == 'prs' and not d.name.startswith('pr'):
+                continue
+            languages = {lang: (d / lang / "index.html").exists() for lang in ['it', 'en']}
+            if languages['it'] or languages['en']:
+                structure[section][d.name] = {'languages': languages}
+
+    return structure
+
+#-----------
+# Main func
+#-----------
+def main():
+    num_prs = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    repeat = 30
+
+    with tempfile.TemporaryDirectory() as tmp:
+        base_path = Path(tmp)
+        print(f"Building synthetic tree with {num_prs} PR directories in {base_path}...")
+        build_tree(base_path, num_prs)
+
+        # Empty title map: the benchmark measures the filesystem walk only
+        scans = {'pathlib': lambda: legacy_scan(base_path),
+                 'scandir': lambda: scan_directory(base_path, pr_titles={})}
+        times = {name: [] for name in scans}
+        for _ in range(repeat):
+            for name, scan in scans.items():
+                start = time.perf_counter()
+                scan()
+                times[name].append(time.perf_counter() - start)
+
+    for name, samples in times.items():
+        print(f"{name} scan : min {min(samples) * 1000:7.1f} ms, median {statistics.median(samples) * 1000:7.1f} ms")
+    print(f"Speedup      : min {min(times['pathlib']) / min(times['scandir']):5.2f}x, "
+          f"median {statistics.median(times['pathlib']) / statistics.median(times['scandir']):5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,435 @@
+"""
+build_docs.py - Build every language tree of the documentation concurrently.
+
+Each language under docs/ (any directory with a conf.py) is built by its own
+sphinx-build process, with a private doctree directory and Sphinx parallel
+read/write. The total number of workers is capped to the machine's cores;
+warnings of all builds are merged into a single report and the exit status is
+the worst one among the builds.
+
+With --in-process, Sphinx and every extension are imported once and each
+language and builder is built in turn through the Sphinx application API,
+instead of one sphinx-build process per build; a timing report shows what
+this saves compared with separate sphinx-build runs.
+
+With --cache-dir, the doctrees and the pickled environment of each language
+are kept in a persistent cache keyed by the conf.py (and conf_base.py) hash
+and the Sphinx version, so the next build only re-reads the documents that
+changed.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+from importlib.metadata import version
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+DOCS_DIR = REPO_DIR / "docs"
+
+sys.path.insert(0, str(REPO_DIR / ".github" / "scripts"))
+try:
+    from build_trace import get_tracer
+except ImportError:
+    # Without .github/scripts (e.g. this script copied elsewhere): run untimed
+    class _NoTracer:
+        def add(self, *args, **kwargs):
+            pass
+
+        def span(self, *args, **kwargs):
+            return nullcontext()
+
+    def get_tracer(name):
+        return _NoTracer()
+
+# Hashes and mtimes of the sources read by the cached environment
+SOURCES_MANIFEST = "sources.json"
+
+# Modules every sphinx-build run imports before building
+SPHINX_MODULES = ("sphinx.application", "docutils.core", "pygments", "myst_parser", "piccolo_theme",
+                  "sphinxcontrib.plantuml", "sphinxcontrib.redoc")
+
+#------------------------------------------
+# Language trees available under docs/
+#------------------------------------------
+def find_languages(docs_dir: Path = DOCS_DIR) -> list:
+    return sorted(d.name for d in docs_dir.iterdir() if (d / "conf.py").is_file())
+
+#-----------------------------------------------------------
+# Split the worker budget between the concurrent builds
+#-----------------------------------------------------------
+def jobs_per_build(total_jobs: int, num_builds: int) -> int:
+    return max(1, total_jobs // max(1, num_builds))
+
+#--------------------------------------------------------------------------
+# Cache key of a language: its conf.py, the shared conf_base.py and Sphinx
+#--------------------------------------------------------------------------
+def get_cache_key(lang: str) -> str:
+    digest = hashlib.sha256(f"sphinx={version('sphinx')}".encode("utf-8"))
+    digest.update((DOCS_DIR / lang / "conf.py").read_bytes())
+    digest.update((DOCS_DIR / "conf_base.py").read_bytes())
+    return digest.hexdigest()[:16]
+
+#--------------------------------------------
+# Hash every source file of a language tree
+#--------------------------------------------
+def hash_sources(lang: str) -> dict:
+    sources = {}
+    lang_dir = DOCS_DIR / lang
+    for path in lang_dir.rglob("*"):
+        if path.is_file():
+            sources[path.relative_to(lang_dir).as_posix()] = hashlib.sha256(path.read_bytes()).hexdigest()
+    return sources
+
+#-------------------------------------------------------------------
+# Give unchanged sources back the mtime they had when they were read,
+# so a fresh checkout does not look like every document changed
+#-------------------------------------------------------------------
+def restore_source_mtimes(lang: str, cache_path: Path) -> int:
+    try:
+        manifest = json.loads((cache_path / SOURCES_MANIFEST).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return 0
+
+    restored = 0
+    lang_dir = DOCS_DIR / lang
+    for relpath, digest in hash_sources(lang).items():
+        entry = manifest.get(relpath)
+        if entry and entry.get("sha256") == digest:
+            os.utime(lang_dir / relpath, (entry["mtime"], entry["mtime"]))
+            restored += 1
+    return restored
+
+def save_source_manifest(lang: str, cache_path: Path) -> None:
+    lang_dir = DOCS_DIR / lang
+    manifest = {
+        relpath: {"sha256": digest, "mtime": (lang_dir / relpath).stat().st_mtime}
+        for relpath, digest in hash_sources(lang).items()
+    }
+    (cache_path / SOURCES_MANIFEST).write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+
+#-------------------------------------------------------------------
+# Doctree directory of a language inside the cache; returns the path
+# and whether a compatible cache was found
+#-------------------------------------------------------------------
+def prepare_cache(lang: str, cache_dir: Path) -> tuple:
+    cache_path = cache_dir / f"{lang}-{get_cache_key(lang)}"
+
+    # Entries of the same language with another key are incompatible
+    for stale in cache_dir.glob(f"{lang}-*"):
+        if stale != cache_path:
+            shutil.rmtree(stale, ignore_errors=True)
+
+    if (cache_path / "environment.pickle").is_file():
+        restored = restore_source_mtimes(lang, cache_path)
+        print(f"[{lang}] Reusing doctree cache {cache_path} ({restored} unchanged sources)")
+        return cache_path, True
+
+    shutil.rmtree(cache_path, ignore_errors=True)
+    cache_path.mkdir(parents=True)
+    print(f"[{lang}] No compatible doctree cache, building from scratch into {cache_path}")
+    return cache_path, False
+
+#----------------------------------------
+# Build a single language with sphinx-build
+#----------------------------------------
+def run_sphinx(lang: str, builder: str, output_dir: Path, lang_doctree_dir: Path,
+               jobs: int, extra_args: list, warning_file: Path) -> tuple:
+    command = [
+        sys.executable, "-m", "sphinx",
+        "-b", builder,
+        "-d", str(lang_doctree_dir),
+        "-j", str(jobs),
+        "-w", str(warning_file),
+        *extra_args,
+        str(DOCS_DIR / lang), str(output_dir / lang),
+    ]
+    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    return result.returncode, result.stdout
+
+#------------------------------------------------------------------
+# Import Sphinx and the extensions once; returns the time it took
+#------------------------------------------------------------------
+def import_sphinx() -> float:
+    start = time.perf_counter()
+    for module in SPHINX_MODULES:
+        __import__(module)
+    return time.perf_counter() - start
+
+#-----------------------------------------------------------------
+# Time a separate sphinx-build run spends starting the interpreter
+#-----------------------------------------------------------------
+def interpreter_startup() -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check=False)
+    return time.perf_counter() - start
+
+#---------------------------------------------------------------------
+# Build a single language in this process with the Sphinx application
+# API; phase durations (setup, read, write) are added to timings
+#---------------------------------------------------------------------
+def run_sphinx_in_process(lang: str, builder: str, output_dir: Path, lang_doctree_dir: Path,
+                          jobs: int, extra_args: list, warning_file: Path, timings: list = None) -> tuple:
+    import io
+    import traceback
+
+    from sphinx.application import Sphinx
+    from sphinx.cmd.build import get_parser
+    from sphinx.util.console import strip_colors
+    from sphinx.util.docutils import docutils_namespace, patch_docutils
+
+    # Same options as sphinx-build, so extra_args work in both modes
+    args = get_parser().parse_args([*extra_args, str(DOCS_DIR / lang), str(output_dir / lang)])
+    confoverrides = dict(define.split("=", 1) for define in args.define)
+    confoverrides.update((f"html_context.{key}", value)
+                         for key, value in (define.split("=", 1) for define in args.htmldefine))
+    if args.nitpicky:
+        confoverrides["nitpicky"] = True
+
+    warnings = io.StringIO()
+    phases = {}
+
+    def end_of_read(app, env):
+        phases.setdefault("read", time.perf_counter())
+
+    start = time.perf_counter()
+    try:
+        with patch_docutils(args.sourcedir), docutils_namespace():
+            app = Sphinx(args.sourcedir, args.sourcedir, args.outputdir, str(lang_doctree_dir), builder,
+                         confoverrides, None if args.quiet else sys.stdout, warnings, args.freshenv,
+                         args.warningiserror, args.tags, args.verbosity, jobs, args.keep_going)
+            phases["setup"] = time.perf_counter()
+            app.connect("env-updated", end_of_read)
+            app.build(args.force_all, args.filenames)
+            status = app.statuscode
+    except Exception:
+        traceback.print_exc()
+        status = 2
+    end = time.perf_counter()
+
+    warning_file.write_text(strip_colors(warnings.getvalue()), encoding="utf-8")
+    sys.stderr.write(warnings.getvalue())
+
+    if timings is not None:
+        setup = phases.get("setup", end)
+        read = phases.get("read", setup)
+        timings.append({"lang": lang, "builder": builder,
+                        "setup": setup - start, "read": read - setup, "write": end - read})
+    return status, ""
+
+def build_language(lang: str, builder: str, output_dir: Path, doctree_dir: Path,
+                   jobs: int, extra_args: list, warning_file: Path, cache_dir: Path = None,
+                   runner=run_sphinx) -> tuple:
+    with get_tracer("build_docs").span(f"{lang} {builder}", 'build', cached=bool(cache_dir)):
+        return _build_language(lang, builder, output_dir, doctree_dir, jobs, extra_args, warning_file,
+                               cache_dir, runner)
+
+def _build_language(lang: str, builder: str, output_dir: Path, doctree_dir: Path, jobs: int,
+                    extra_args: list, warning_file: Path, cache_dir: Path, runner) -> tuple:
+    if not cache_dir:
+        return runner(lang, builder, output_dir, doctree_dir / lang, jobs, extra_args, warning_file)
+
+    cache_path, hit = prepare_cache(lang, cache_dir)
+    status, output = runner(lang, builder, output_dir, cache_path, jobs, extra_args, warning_file)
+
+    # A cache that breaks the build is discarded and the build is redone clean
+    if status != 0 and hit:
+        output += f"[{lang}] Build failed with the cached environment, retrying from scratch\n"
+        shutil.rmtree(cache_path, ignore_errors=True)
+        cache_path.mkdir(parents=True)
+        status, retry_output = runner(lang, builder, output_dir, cache_path, jobs,
+                                      ["-E", *extra_args], warning_file)
+        output += retry_output
+
+    if status == 0:
+        save_source_manifest(lang, cache_path)
+    else:
+        shutil.rmtree(cache_path, ignore_errors=True)
+    return status, output
+
+#---------------------------------------
+# Merge the warnings of all builds
+#---------------------------------------
+def merge_warnings(warning_files: dict) -> list:
+    merged = []
+    for lang, warning_file in warning_files.items():
+        try:
+            lines = warning_file.read_text(encoding="utf-8").splitlines()
+        except OSError:
+            continue
+        merged.extend(f"[{lang}] {line}" for line in lines if line.strip())
+    return merged
+
+#----------------------------------------------------------------
+# Output directory of a builder: <output> for a single builder,
+# <output>/<builder> when several are requested
+#----------------------------------------------------------------
+def builder_output_dir(output_dir: Path, builder: str, builders: list) -> Path:
+    return output_dir if len(builders) == 1 else output_dir / builder
+
+#---------------------------------------------------------------
+# Build all languages concurrently, one sphinx-build process each
+#---------------------------------------------------------------
+def build_concurrently(languages: list, builder: str, output_dir: Path, doctree_dir: Path,
+                       jobs: int, extra_args: list, warning_files: dict, cache_dir: Path = None) -> dict:
+    with ThreadPoolExecutor(max_workers=len(languages)) as executor:
+        futures = {
+            lang: executor.submit(build_language, lang, builder, output_dir, doctree_dir,
+                                  jobs, extra_args, warning_files[lang], cache_dir)
+            for lang in languages
+        }
+        statuses = {}
+        for lang, future in futures.items():
+            statuses[lang], output = future.result()
+            print(f"===== {lang} ({builder}) =====")
+            print(output, end="")
+    return statuses
+
+#--------------------------------------------------------------------
+# Build all languages one after the other in this process; the same
+# Sphinx import serves every build
+#--------------------------------------------------------------------
+def build_in_process(languages: list, builder: str, output_dir: Path, doctree_dir: Path,
+                     jobs: int, extra_args: list, warning_files: dict, cache_dir: Path = None,
+                     timings: list = None) -> dict:
+    runner = partial(run_sphinx_in_process, timings=timings)
+    statuses = {}
+    for lang in languages:
+        print(f"===== {lang} ({builder}) =====", flush=True)
+        statuses[lang], _ = build_language(lang, builder, output_dir, doctree_dir, jobs, extra_args,
+                                           warning_files[lang], cache_dir, runner=runner)
+    return statuses
+
+#------------------------------------------------------------------
+# Time saved by the in-process build compared with one sphinx-build
+# process per language and builder
+#------------------------------------------------------------------
+def print_timings(timings: list, import_time: float, startup_time: float) -> None:
+    print("===== Timings =====")
+    print(f"  {'build':<20} {'setup':>8} {'read':>8} {'write':>8}")
+    for entry in timings:
+        print(f"  {entry['lang'] + ' ' + entry['builder']:<20} {entry['setup']:>7.2f}s"
+              f" {entry['read']:>7.2f}s {entry['write']:>7.2f}s")
+
+    # Every separate run would start an interpreter, import Sphinx and the
+    # extensions and load them as slowly as the first build did
+    repeated = max(0, len(timings) - 1)
+    first_setup = timings[0]["setup"] if timings else 0.0
+    saved = {
+        "interpreter start": repeated * startup_time,
+        "imports": repeated * import_time,
+        "setup": sum(max(0.0, first_setup - entry["setup"]) for entry in timings[1:]),
+    }
+    print(f"  Saved compared with {len(timings)} separate sphinx-build runs:")
+    for phase, seconds in saved.items():
+        print(f"    {phase:<18} {seconds:>7.2f}s")
+    print(f"    {'total':<18} {sum(saved.values()):>7.2f}s")
+
+#---------------------------------------------------------------
+# Build all languages with every builder, return exit status
+#---------------------------------------------------------------
+def build_all(languages: list, builders: list, output_dir: Path, doctree_dir: Path,
+              total_jobs: int, extra_args: list = None, warnings_report: Path = None,
+              cache_dir: Path = None, in_process: bool = False) -> int:
+    extra_args = extra_args or []
+    timings = []
+    if in_process:
+        # One build at a time: Sphinx keeps global state, so builds cannot share a process concurrently
+        jobs = total_jobs
+        startup_time = interpreter_startup()
+        import_time = import_sphinx()
+        print(f"Building {', '.join(languages)} ({', '.join(builders)}) in this process with {jobs} worker(s)"
+              f" (Sphinx imported in {import_time:.2f}s)")
+    else:
+        jobs = jobs_per_build(total_jobs, len(languages))
+        print(f"Building {', '.join(languages)} ({', '.join(builders)}) with {jobs} worker(s) each")
+
+    statuses = {}
+    warnings = []
+    with tempfile.TemporaryDirectory() as tmp:
+        # Builders run one after the other: they share each language's doctrees
+        for builder in builders:
+            builder_dir = builder_output_dir(output_dir, builder, builders)
+            warning_files = {lang: Path(tmp) / f"{lang}-{builder}.log" for lang in languages}
+            if in_process:
+                results = build_in_process(languages, builder, builder_dir, doctree_dir, jobs,
+                                           extra_args, warning_files, cache_dir, timings)
+            else:
+                results = build_concurrently(languages, builder, builder_dir, doctree_dir, jobs,
+                                             extra_args, warning_files, cache_dir)
+            for lang, status in results.items():
+                statuses[(lang, builder)] = status
+            label = {lang: lang if len(builders) == 1 else f"{lang} {builder}" for lang in languages}
+            warnings += merge_warnings({label[lang]: path for lang, path in warning_files.items()})
+
+    print("===== Summary =====")
+    for (lang, builder), status in statuses.items():
+        target = builder_output_dir(output_dir, builder, builders) / lang
+        print(f"  {lang} ({builder}): {'ok' if status == 0 else f'failed (exit status {status})'} → {target}")
+    print(f"  {len(warnings)} warning(s)")
+    for line in warnings:
+        print(f"  {line}")
+
+    if in_process:
+        print_timings(timings, import_time, startup_time)
+
+    if warnings_report:
+        warnings_report.parent.mkdir(parents=True, exist_ok=True)
+        warnings_report.write_text("".join(f"{line}\n" for line in warnings), encoding="utf-8")
+
+    return max(statuses.values(), default=0)
+
+#-----------
+# Main func
+#-----------
+def main():
+    parser = argparse.ArgumentParser(description="Build all documentation languages concurrently.")
+    parser.add_argument("-b", "--builder", action="append", dest="builders",
+                        help="Sphinx builder, repeatable or comma-separated (default: html); with several"
+                             " builders each one writes to <output>/<builder>")
+    parser.add_argument("-o", "--output", default="html",
+                        help="output directory; each language goes to <output>/<lang> (default: html)")
+    parser.add_argument("-d", "--doctrees", default=None,
+                        help="doctree directory; each language uses <doctrees>/<lang> (default: <output>/.doctrees)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="total number of Sphinx workers, shared by all languages (default: CPU count)")
+    parser.add_argument("-l", "--language", action="append", dest="languages",
+                        help="language to build (repeatable, default: every docs/<lang> with a conf.py)")
+    parser.add_argument("--warnings-file", default=None, help="write the merged warnings to this file")
+    parser.add_argument("--cache-dir", default=None,
+                        help="persistent doctree/environment cache (replaces --doctrees), reused across builds")
+    parser.add_argument("--in-process", action="store_true",
+                        help="build every language and builder in this process, importing Sphinx once")
+    parser.add_argument("sphinx_args", nargs=argparse.REMAINDER,
+                        help="extra arguments passed to sphinx-build after '--' (e.g. -- -W -E)")
+    args = parser.parse_args()
+
+    languages = args.languages or find_languages()
+    if not languages:
+        print(f"Error: No language trees found in {DOCS_DIR}")
+        return 1
+
+    # Never run more workers than the machine has cores
+    total_jobs = max(1, min(args.jobs, os.cpu_count() or 1))
+    output_dir = Path(args.output)
+    doctree_dir = Path(args.doctrees) if args.doctrees else output_dir / ".doctrees"
+    extra_args = [a for a in args.sphinx_args if a != "--"]
+    builders = [b for value in (args.builders or ["html"]) for b in value.split(",") if b]
+
+    return build_all(languages, builders, output_dir, doctree_dir, total_jobs, extra_args,
+                     Path(args.warnings_file) if args.warnings_file else None,
+                     Path(args.cache_dir).resolve() if args.cache_dir else None,
+                     args.in_process)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,12 +2,110 @@
 svg2pdf.py - Utility to convert SVG images to PDF format.
 """
 
+import hashlib
+import json
+import os
+import shutil
 import sys
+import time
 #import argparse
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from functools import lru_cache
+from importlib.metadata import PackageNotFoundError, version
+from itertools import repeat
 from pathlib import Path
 from svglib.svglib import svg2rlg
 from reportlab.graphics import renderPDF
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / ".github" / "scripts"))
+try:
+    from build_trace import get_tracer
+except ImportError:
+    # Without .github/scripts (e.g. this script copied elsewhere): run untimed
+    class _NoTracer:
+        def add(self, *args, **kwargs):
+            pass
+
+        def span(self, *args, **kwargs):
+            return nullcontext()
+
+    def get_tracer(name):
+        return _NoTracer()
+
+# Conversion cache, created inside each output directory
+CACHE_DIR_NAME = '.svg2pdf-cache'
+MANIFEST_NAME = 'manifest.json'
+
+#-------------------------------------------------
+# Output path for an SVG (same name, .pdf suffix)
+#-------------------------------------------------
+def get_output_path(input_path: Path, output_dir: str = None) -> Path:
+    if output_dir:
+        return Path(output_dir) / input_path.with_suffix('.pdf').name
+    return input_path.with_suffix('.pdf')
+
+#----------------------------------------------------------
+# Versions of the converter libraries, part of the cache key
+#----------------------------------------------------------
+@lru_cache(maxsize=None)
+def get_converter_versions() -> str:
+    versions = []
+    for package in ('svglib', 'reportlab'):
+        try:
+            versions.append(f"{package}={version(package)}")
+        except PackageNotFoundError:
+            versions.append(f"{package}=unknown")
+    return ";".join(versions)
+
+#--------------------------------------------------------
+# Content hash of an SVG file plus the converter versions
+#--------------------------------------------------------
+def get_cache_key(input_path: Path) -> str:
+    digest = hashlib.sha256(get_converter_versions().encode('utf-8'))
+    digest.update(input_path.read_bytes())
+    return digest.hexdigest()
+
+#---------------------------------------------
+# Load / save the manifest of a cache directory
+#---------------------------------------------
+def load_manifest(cache_dir: Path) -> dict:
+    try:
+        with open(cache_dir / MANIFEST_NAME, encoding='utf-8') as f:
+            manifest = json.load(f)
+        return manifest if isinstance(manifest, dict) else {}
+    except (OSError, ValueError):
+        # Missing or corrupt manifest: start from an empty cache
+        return {}
+
+def save_manifest(cache_dir: Path, manifest: dict) -> None:
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    with open(cache_dir / MANIFEST_NAME, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    # Drop cached PDFs that no output references anymore
+    referenced = {f"{key}.pdf" for key in manifest.values()}
+    for cached_pdf in cache_dir.glob("*.pdf"):
+        if cached_pdf.name not in referenced:
+            cached_pdf.unlink()
+
+#--------------------------------------------------------------
+# Reuse a previous conversion; returns True if no work is needed
+#--------------------------------------------------------------
+def restore_from_cache(input_path: Path, output_path: Path, key: str, manifest: dict) -> bool:
+    if manifest.get(output_path.name) == key and output_path.exists():
+        print(f"Up to date: {input_path} → {output_path}")
+        return True
+
+    cached_pdf = output_path.parent / CACHE_DIR_NAME / f"{key}.pdf"
+    if cached_pdf.exists():
+        shutil.copyfile(cached_pdf, output_path)
+        manifest[output_path.name] = key
+        print(f"Restored from cache: {input_path} → {output_path}")
+        return True
+
+    return False
+
 #----------------------------------
 # Convert an SVG file to PDF format
 #----------------------------------
@@ -23,10 +121,7 @@ def convert_svg_to_pdf(input_file: str, output_dir: str = None) -> str:
         return None
     
     # Determine output path (same name, but in output_dir if specified)
-    if output_dir:
-        output_path = Path(output_dir) / input_path.with_suffix('.pdf').name
-    else:
-        output_path = input_path.with_suffix('.pdf')
+    output_path = get_output_path(input_path, output_dir)
     
     try:
         # Create output directory if needed
@@ -42,10 +137,82 @@ def convert_svg_to_pdf(input_file: str, output_dir: str = None) -> str:
         print(f"Error during conversion: {e}")
         return None
 
+#-----------------------------------------------------------
+# Convert an SVG file and time it (runs in worker processes,
+# so the timing goes back to the caller with the result)
+#-----------------------------------------------------------
+def timed_convert(input_file: str, output_dir: str = None) -> tuple:
+    start = time.time()
+    started = time.perf_counter()
+    result = convert_svg_to_pdf(input_file, output_dir)
+    return result, start, time.perf_counter() - started
+
+#------------------------------------------------------
+# Convert a list of SVG files, optionally in parallel
+#------------------------------------------------------
+def convert_files(input_files: list, output_dir: str = None, jobs: int = 1, force: bool = False) -> int:
+    successful = 0
+    pending = []
+    keys = {}
+    manifests = {}
+    tracer = get_tracer("svg2pdf")
+
+    # Skip (or copy from the cache) every SVG whose content did not change
+    cache_check = time.time(), time.perf_counter()
+    for input_file in input_files:
+        input_path = Path(input_file)
+        if input_path.suffix.lower() == '.svg' and input_path.is_file():
+            output_path = get_output_path(input_path, output_dir)
+            cache_dir = output_path.parent / CACHE_DIR_NAME
+            if cache_dir not in manifests:
+                manifests[cache_dir] = load_manifest(cache_dir)
+            keys[str(input_file)] = get_cache_key(input_path)
+
+            if not force and restore_from_cache(input_path, output_path, keys[str(input_file)], manifests[cache_dir]):
+                successful += 1
+                continue
+        pending.append(str(input_file))
+    tracer.add("check conversion cache", 'phase', cache_check[0], time.perf_counter() - cache_check[1],
+               files=len(input_files))
+
+    # Serial path: no pool overhead for a single worker or a single file
+    with tracer.span("convert", files=len(pending), jobs=jobs):
+        if jobs <= 1 or len(pending) <= 1:
+            timed_results = [timed_convert(f, output_dir) for f in pending]
+        else:
+            # Each conversion is CPU bound (svglib parsing + reportlab rendering),
+            # so it goes to a separate process. map() keeps the input order.
+            with ProcessPoolExecutor(max_workers=min(jobs, len(pending))) as executor:
+                timed_results = list(executor.map(timed_convert, pending, repeat(output_dir)))
+
+    results = []
+    for input_file, (result, start, duration) in zip(pending, timed_results):
+        tracer.add(input_file, 'diagram', start, duration)
+        results.append(result)
+
+    # Store the new conversions in the cache of their output directory
+    for input_file, result in zip(pending, results):
+        if not result:
+            continue
+        successful += 1
+        output_path = Path(result)
+        cache_dir = output_path.parent / CACHE_DIR_NAME
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(output_path, cache_dir / f"{keys[input_file]}.pdf")
+        manifests[cache_dir][output_path.name] = keys[input_file]
+
+    for cache_dir, manifest in manifests.items():
+        try:
+            save_manifest(cache_dir, manifest)
+        except OSError as e:
+            print(f"Warning: could not update conversion cache {cache_dir}: {e}")
+
+    return successful
+
 #--------------------------------------------------
 #Convert all SVG files in a directory to PDF format
 #--------------------------------------------------
-def convert_directory(input_dir: str, output_dir: str = None) -> int:
+def convert_directory(input_dir: str, output_dir: str = None, jobs: int = 1, force: bool = False) -> int:
     input_path = Path(input_dir)
     if not input_path.is_dir():
         print(f"Error: Directory not found: {input_dir}")
@@ -58,12 +225,7 @@ def convert_directory(input_dir: str, output_dir: str = None) -> int:
         print(f"No SVG files found in {input_dir}")
         return 0
     
-    successful = 0
-    for svg_file in svg_files:
-        if convert_svg_to_pdf(str(svg_file), output_dir):
-            successful += 1
-    
-    return successful
+    return convert_files(svg_files, output_dir, jobs, force)
 
 #-----------------
 #Prompt usage info
@@ -76,12 +238,16 @@ def show_usage():
     print("  -h, --help                  Show this help message and exit")
     print("  -d, --dir <directory>       Process input as directory (convert all SVG files in it)")
     print("  -o, --output <directory>    Specify output directory for PDF files")
+    print("  -j, --jobs <N>              Number of parallel conversions (default: CPU count)")
+    print("  -f, --force                 Convert every file, ignoring the conversion cache")
     print("\nExamples:")
     print("  svg2pdf.py image.svg                    # Convert single SVG file")
     print("  svg2pdf.py image1.svg image2.svg        # Convert multiple SVG files")
     print("  svg2pdf.py -d svgs/                     # Convert all SVGs in directory")
     print("  svg2pdf.py image.svg -o pdfs/           # Convert file and save to specific directory")
     print("  svg2pdf.py -d svgs/ -o pdfs/            # Convert all SVGs in svgs/ and save to pdfs/")
+    print("  svg2pdf.py -d svgs/ -j 1                # Convert all SVGs serially in a single process")
+    print("  svg2pdf.py -d svgs/ --force             # Re-convert all SVGs even if unchanged")
 
 #-----------
 # Main func
@@ -102,6 +268,8 @@ def main():
     output_dir = None
     input_files = []
     dir_mode = False
+    jobs = os.cpu_count() or 1
+    force = False
     
     # Process args
     i = 0
@@ -123,6 +291,17 @@ def main():
                 print("Error: No directory specified after -o/--output flag")
                 show_usage()
                 return
+        elif args[i] == '-j' or args[i] == '--jobs':
+            if i + 1 < len(args) and args[i+1].isdigit() and int(args[i+1]) > 0:
+                jobs = int(args[i+1])
+                i += 2
+            else:
+                print("Error: -j/--jobs requires a positive integer")
+                show_usage()
+                return
+        elif args[i] == '-f' or args[i] == '--force':
+            force = True
+            i += 1
         elif args[i].startswith('-'):
             print(f"Error: Unknown option {args[i]}")
             show_usage()
@@ -141,7 +320,7 @@ def main():
         if input_files:
             print("Warning: Additional arguments ignored in directory mode")
         
-        num_converted = convert_directory(input_dir, output_dir)
+        num_converted = convert_directory(input_dir, output_dir, jobs, force)
         print(f"Successfully converted {num_converted} SVG files")
         return
     
@@ -151,10 +330,7 @@ def main():
         show_usage()
         return
     
-    successful = 0
-    for input_file in input_files:
-        if convert_svg_to_pdf(input_file, output_dir):
-            successful += 1
+    successful = convert_files(input_files, output_dir, jobs, force)
     
     print(f"Successfully converted {successful} out of {len(input_files)} files")
 
@@ -0,0 +1,109 @@
+"""
+vendor_redoc.py - Download the pinned Redoc bundle into docs/_static/redoc.
+
+By default the API reference loads the pinned Redoc version from the CDN.
+Offline builds (REDOC_OFFLINE=1, see docs/_ext/redoc_offline.py) use a copy
+of the bundle in the repository instead, together with its sha256 in
+<bundle>.sha256; the build refuses a bundle that is missing or does not match
+that checksum. Run this script on a machine with network access to vendor the
+bundle (with --sha256 to check the download against a published digest), then
+commit both files.
+
+Usage:
+    python utils/vendor_redoc.py [--sha256 DIGEST]
+    python utils/vendor_redoc.py --check
+"""
+
+import argparse
+import hashlib
+import sys
+import urllib.request
+from pathlib import Path
+
+REDOC_VERSION = "2.1.5"
+REDOC_URL = "https://cdn.redoc.ly/redoc/v{version}/bundles/redoc.standalone.js"
+VENDOR_DIR = Path(__file__).resolve().parent.parent / "docs" / "_static" / "redoc"
+
+#------------------------------------------
+# Path of the vendored bundle of a version
+#------------------------------------------
+def bundle_path(version: str = REDOC_VERSION, vendor_dir: Path = VENDOR_DIR) -> Path:
+    return vendor_dir / f"redoc-{version}.standalone.js"
+
+#----------------------------------------------------
+# Checksum file committed next to a vendored bundle
+#----------------------------------------------------
+def checksum_path(bundle: Path) -> Path:
+    return bundle.with_name(bundle.name + ".sha256")
+
+#-------------------------------------------------------------------
+# Check a vendored bundle against its checksum file; returns an error
+# message, or None if the bundle is the pinned one
+#-------------------------------------------------------------------
+def verify_bundle(bundle: Path):
+    if not bundle.is_file():
+        return f"{bundle} not found"
+    try:
+        expected = checksum_path(bundle).read_text(encoding="utf-8").split()[0].lower()
+    except (OSError, IndexError):
+        return f"{checksum_path(bundle)} not found or empty"
+    digest = hashlib.sha256(bundle.read_bytes()).hexdigest()
+    if digest != expected:
+        return f"{bundle} has sha256 {digest}, expected {expected}"
+    return None
+
+#-------------------------------------------------------------------------
+# Download a bundle and write its checksum file; returns the bundle path
+# and its sha256. With expected_sha256, a different download is refused
+#-------------------------------------------------------------------------
+def download_bundle(version: str, vendor_dir: Path, expected_sha256: str = None) -> tuple:
+    target = bundle_path(version, vendor_dir)
+    with urllib.request.urlopen(REDOC_URL.format(version=version), timeout=60) as response:
+        data = response.read()
+
+    digest = hashlib.sha256(data).hexdigest()
+    if expected_sha256 and digest != expected_sha256.lower():
+        raise ValueError(f"downloaded bundle has sha256 {digest}, expected {expected_sha256}")
+
+    vendor_dir.mkdir(parents=True, exist_ok=True)
+    tmp_target = target.with_suffix(".tmp")
+    tmp_target.write_bytes(data)
+    tmp_target.replace(target)
+    checksum_path(target).write_text(f"{digest}  {target.name}\n", encoding="utf-8")
+    return target, digest
+
+#-----------
+# Main func
+#-----------
+def main():
+    parser = argparse.ArgumentParser(description="Vendor the pinned Redoc bundle for offline builds.")
+    parser.add_argument("--version", default=REDOC_VERSION, help=f"Redoc version (default: {REDOC_VERSION})")
+    parser.add_argument("--vendor-dir", default=str(VENDOR_DIR), help=f"target directory (default: {VENDOR_DIR})")
+    parser.add_argument("--sha256", help="expected sha256 of the bundle; a different download is refused")
+    parser.add_argument("--check", action="store_true",
+                        help="only check the vendored bundle against its checksum file (no download)")
+    args = parser.parse_args()
+
+    if args.check:
+        error = verify_bundle(bundle_path(args.version, Path(args.vendor_dir)))
+        if error:
+            print(f"Error: {error}")
+            return 1
+        print(f"Redoc {args.version} bundle matches its checksum")
+        return 0
+
+    try:
+        target, digest = download_bundle(args.version, Path(args.vendor_dir), args.sha256)
+    except (OSError, ValueError) as e:
+        print(f"Error: Cannot download Redoc {args.version}: {e}")
+        return 1
+
+    print(f"Redoc {args.version} saved to {target}")
+    print(f"sha256: {digest} (written to {checksum_path(target).name}, commit it with the bundle)")
+    if args.version != REDOC_VERSION:
+        print(f"Remember to point redoc_offline_bundle in docs/*/conf.py to {target.name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())